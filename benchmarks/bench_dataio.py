@@ -0,0 +1,42 @@
+"""
+Time DataIO.save and DataIO.load against the number of rows saved, for each storage backend.
+
+Usage: python benchmarks/bench_dataio.py [row counts...]
+"""
+import sys
+import time
+from os import path
+from tempfile import TemporaryDirectory
+
+from corpus import make_corpus
+
+from looksatwords.dataio import DataIO
+
+
+def bench(n, backend='tinydb'):
+    with TemporaryDirectory() as tmp:
+        dataio = DataIO(db_path=path.join(tmp, 'data.json'), backend=backend)
+        dataio.df = make_corpus(n)
+        start = time.perf_counter()
+        dataio.save()
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        dataio.load()
+        loaded = time.perf_counter() - start
+    return saved, loaded
+
+
+def main(sizes, backends=('tinydb', 'sqlite', 'parquet')):
+    print(f'{"backend":>8} {"rows":>10} {"save (s)":>10} {"load (s)":>10} {"rows/s":>12}')
+    for backend in backends:
+        for n in sizes:
+            try:
+                saved, loaded = bench(n, backend)
+            except ImportError as e:
+                print(f'{backend:>8} skipped: {e}')
+                break
+            print(f'{backend:>8} {n:>10} {saved:>10.3f} {loaded:>10.3f} {n / saved:>12.0f}')
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [100, 1000, 5000, 20000])
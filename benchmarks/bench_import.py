@@ -0,0 +1,65 @@
+"""
+Time importing each module of the package and running the CLI's --help, each in a fresh
+interpreter as a cron job would, and list the slowest imports pulled in by each.
+
+Usage: python benchmarks/bench_import.py [runs]
+"""
+import subprocess
+import sys
+import time
+
+modules = [
+    'looksatwords.__main__',
+    'looksatwords.dataio',
+    'looksatwords.gatherer',
+    'looksatwords.orchestrator',
+    'looksatwords.generator',
+    'looksatwords.analyzer',
+    'looksatwords.visualizer',
+]
+
+
+def best_time(args, runs):
+    """Fastest wall seconds of runs runs of python with args"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def slowest_imports(module, top=5):
+    """
+    The top level packages other than looksatwords that importing module takes longest to
+    import, as (cumulative microseconds, name), from python -X importtime
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        name = name.strip()
+        if '.' not in name and name != 'looksatwords':
+            imports.append((int(cumulative), name))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main(runs=3):
+    print(f'{"command":>40} {"seconds":>8}  slowest imports')
+    baseline = best_time(['-c', 'pass'], runs)
+    print(f'{"python -c pass":>40} {baseline:>8.3f}')
+    seconds = best_time(['-m', 'looksatwords', '--help'], runs)
+    print(f'{"python -m looksatwords --help":>40} {seconds:>8.3f}')
+    for module in modules:
+        seconds = best_time(['-c', f'import {module}'], runs)
+        slowest = ', '.join(f'{name} {us / 1e6:.2f}s' for us, name in slowest_imports(module))
+        print(f'{"import " + module:>40} {seconds:>8.3f}  {slowest}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
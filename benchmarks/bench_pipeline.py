@@ -0,0 +1,99 @@
+"""
+Time each stage of the pipeline on synthetic corpora, recording throughput and peak memory.
+
+Stages run in order on the same data, as they do in a run:
+save, load, validate, build_words_df, preprocess, analyze and make_plots.
+Gathering and generating are not timed, they wait on Google News and Ollama.
+Peak memory is the peak of Python allocations traced by tracemalloc during the stage,
+which slows the stages down, pass --no-memory for timings only.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 100 1000 ...] [--stages ...]
+       [--workers N] [--backend tinydb|sqlite|parquet] [--json results.json]
+       [--validation full|head|random]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from os import path
+from tempfile import TemporaryDirectory
+
+from corpus import make_corpus
+
+from looksatwords.analyzer import Analyzer
+from looksatwords.dataio import DataIO
+from looksatwords.gatherer import Gatherer
+from looksatwords.validator import gnews_data_schema
+from looksatwords.visualizer import Visualizer
+
+stages = ['save', 'load', 'validate', 'build_words_df', 'preprocess', 'analyze', 'make_plots']
+
+
+def measure(func, memory=True):
+    """Call func, returning its wall seconds and peak traced bytes (None without memory)"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+
+
+def run_stages(df, tmp, names=stages, workers=1, backend='tinydb', memory=True, validation='full'):
+    """Run the stages in names on df, yielding (stage, seconds, peak bytes)"""
+    db_path = path.join(tmp, 'data.json')
+    dataio = DataIO(db_path=db_path, table_name='bench', backend=backend)
+    gatherer = Gatherer(
+        db_path=db_path, table_name='bench', raw_data_schema=gnews_data_schema, backend=backend, validation=validation
+    )
+    analyzer = Analyzer(db_path=db_path, dfs=[df], workers=workers, backend=backend)
+    visualizer = Visualizer(db_path=db_path, output_path=path.join(tmp, 'output/'), backend=backend)
+    dataio.df = df
+    gatherer.df = df.copy()
+    funcs = {
+        'save': dataio.save,
+        'load': dataio.load,
+        'validate': gatherer.validate,
+        'build_words_df': analyzer.build_words_df,
+        'preprocess': analyzer.preprocess,
+        'analyze': analyzer.analyze,
+        'make_plots': lambda: setattr(visualizer, 'df', analyzer.df) or visualizer.make_plots(),
+    }
+    for name in stages:
+        if name in names:
+            seconds, peak = measure(funcs[name], memory)
+            yield name, seconds, peak
+
+
+def main(sizes, names=stages, workers=1, backend='tinydb', memory=True, json_path=None, validation='full'):
+    results = []
+    print(f'{"stage":>15} {"rows":>9} {"seconds":>9} {"rows/s":>11} {"peak MiB":>9}')
+    for n in sizes:
+        df = make_corpus(n)
+        with TemporaryDirectory() as tmp:
+            for name, seconds, peak in run_stages(df, tmp, names, workers, backend, memory, validation):
+                peak_mib = '' if peak is None else f'{peak / 2**20:.1f}'
+                print(f'{name:>15} {n:>9} {seconds:>9.3f} {n / seconds:>11.0f} {peak_mib:>9}')
+                results.append(
+                    {'stage': name, 'rows': n, 'seconds': seconds, 'rows_per_second': n / seconds, 'peak_bytes': peak}
+                )
+    if json_path is not None:
+        with open(json_path, 'w') as f:
+            json.dump({'workers': workers, 'backend': backend, 'validation': validation, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10_000])
+    parser.add_argument('--stages', nargs='+', choices=stages, default=stages)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--backend', default='tinydb')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace peak memory')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    parser.add_argument('--validation', default='full', help='validation mode of the validate stage, see validator.validate')
+    args = parser.parse_args()
+    main(args.sizes, args.stages, args.workers, args.backend, not args.no_memory, args.json, args.validation)
@@ -0,0 +1,68 @@
+"""
+Synthetic article corpora matching gnews_data_schema, for the benchmarks.
+
+Words are drawn from a fixed vocabulary with Zipf distributed frequencies, mixed with
+English stopwords, so caches and the words DataFrame see realistic repetition.
+The same n and seed always give the same corpus.
+"""
+import numpy as np
+from pandas import DataFrame
+
+consonants = list('bcdfghjklmnprstvwz')
+vowels = list('aeiou')
+stopwords = ['the', 'a', 'of', 'to', 'in', 'and', 'for', 'on', 'with', 'is', 'at', 'by']
+
+
+def make_vocabulary(size=5000, seed=0):
+    """size distinct alphabetic pseudo words of two to four syllables"""
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        syllables = rng.integers(2, 5)
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables)))
+    return sorted(words)
+
+
+def make_texts(rng, vocabulary, n, length):
+    """n texts of length words, with one stopword every three words on average"""
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    words = np.array(vocabulary, dtype=object)[
+        rng.choice(len(vocabulary), size=(n, length), p=weights / weights.sum())
+    ]
+    is_stopword = rng.random((n, length)) < 1 / 3
+    words[is_stopword] = np.array(stopwords, dtype=object)[rng.integers(0, len(stopwords), is_stopword.sum())]
+    return [' '.join(row) for row in words]
+
+
+def make_corpus(n, seed=0, duplicates=0.0, publishers=50):
+    """
+    :param n: int, number of articles
+    :param duplicates: float, fraction of articles that repeat an earlier article
+    :param publishers: int, number of distinct publishers
+    :return: DataFrame with the gnews_data_schema columns
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    publisher_ids = rng.integers(0, publishers, n)
+    headlines = make_texts(rng, vocabulary, n, 8)
+    df = DataFrame(
+        {
+            'headline': [f'{headline} - Publisher {p}' for headline, p in zip(headlines, publisher_ids)],
+            'description': make_texts(rng, vocabulary, n, 30),
+            'url': [f'https://publisher{p}.example.com/articles/{i}' for i, p in enumerate(publisher_ids)],
+            'published date': [
+                f'Mon, {day:02d} Jan 2024 {hour:02d}:00:00 GMT'
+                for day, hour in zip(rng.integers(1, 29, n), rng.integers(0, 24, n))
+            ],
+            'publisher': [
+                {'href': f'https://publisher{p}.example.com', 'title': f'Publisher {p}'}
+                for p in publisher_ids
+            ],
+        }
+    )
+    repeated = rng.random(n) < duplicates
+    repeated[0] = False
+    if repeated.any():
+        sources = rng.integers(0, np.arange(n)[repeated])
+        df.loc[repeated, :] = df.iloc[sources].to_numpy()
+    return df
@@ -1,15 +1,26 @@
-from click import Argument, Option, command, option
-from trogon import tui
+from click import Argument, Choice, Group, Option, command, option, pass_context
 from typing_extensions import Annotated
 
-from .analyzer import Analyzer
-from .gatherer import GnewsGatherer, GnewsQuery
-from .generator import GnewsGenerator
-from .logs import log
-from .orchestrator import Orchestrator
-from .visualizer import Visualizer
+# Only click is imported up front so --help and the tui start quickly,
+# the pipeline modules are imported by cli and trogon by the tui command
 
-orchestrator = Orchestrator()
+
+def tui(name=None, command='tui', help='Open Textual TUI.'):
+    """trogon.tui, only importing trogon when the tui command runs"""
+
+    def decorator(app):
+        @pass_context
+        def wrapped_tui(ctx, *args, **kwargs):
+            from trogon import Trogon
+
+            Trogon(app, app_name=name, command_name=command, click_context=ctx).run()
+
+        group = Group()
+        group.add_command(app)
+        group.command(name=command, help=help)(wrapped_tui)
+        return group
+
+    return decorator
 
 
 @tui()
@@ -21,7 +32,7 @@ orchestrator = Orchestrator()
 @option(
     '--analysis_level',
     '-a',
-    help="Analysis level, either leave blank for none, or 'default' for default analysis",
+    help="Analysis level, either leave blank for none, 'default' for default analysis, or 'incremental' to only analyze new articles",
 )
 @option(
     '--visuals_out',
@@ -29,6 +40,22 @@ orchestrator = Orchestrator()
     multiple=True,
     help="Visuals to output, blank for none any of 'sentiment', 'wordcount', 'grammar'",
 )
+@option(
+    '--metrics_out',
+    '-m',
+    help="File to write the time, rows and memory of each stage to, OpenMetrics text for .prom files, JSON otherwise",
+)
+@option('--seed', '-s', type=int, help="Model seed of the first generated article, to reproduce a generation, random if blank")
+@option(
+    '--llm_cache',
+    '-c',
+    help="File to cache LLM responses in, so generating again with the same seed reuses them",
+)
+@option(
+    '--llm_cache_mode',
+    type=Choice(['readwrite', 'replay', 'refresh']),
+    help="'readwrite' (default) to reuse and add responses, 'replay' to only reuse them, 'refresh' to replace them",
+)
 def cli(
     keywords: Annotated[list[str], Option] = ['test'],
     table: Annotated[str, Argument] = 'io',
@@ -36,10 +63,19 @@ def cli(
     num_gath: Annotated[int, Argument] = 3,
     analysis_level: Annotated[str, Option] = 'default',
     visuals_out: Annotated[list[str], Option] = ['sentiment', 'wordcount', 'grammar'],
+    metrics_out: Annotated[str, Option] = None,
+    seed: Annotated[int, Option] = None,
+    llm_cache: Annotated[str, Option] = None,
+    llm_cache_mode: Annotated[str, Option] = None,
 ):
     """
     Orchestrates the gathering, generating, analyzing, and visualizing of articles.
     """
+    from .gatherer import GnewsGatherer, GnewsQuery
+    from .metrics import metrics
+    from .orchestrator import Orchestrator
+
+    orchestrator = Orchestrator()
     orchestrator.add_gatherer(
         GnewsGatherer(
             table_name=table,
@@ -47,19 +83,28 @@ def cli(
         )
     )
     orchestrator.gather()
+    orchestrator.dedup()
     orchestrator.save()
 
-    # orchestrator.add_generator(
-    #     GnewsGenerator(
-    #         seedword=' '.join(keywords),
-    #         # n=num_gen,
-    #     )
-    # )
-    # orchestrator.generate()
+    if llm_cache:
+        from . import llm
+
+        llm.use_cache(llm_cache, mode=llm_cache_mode or 'readwrite')
+    if num_gen:
+        from .generator import GnewsGenerator
+
+        generator = GnewsGenerator(seedword=' '.join(keywords), n=int(num_gen), seed=seed)
+        orchestrator.add_generator(generator)
+        orchestrator.generate()
+        generator.save()
     if analysis_level == 'default':
-        orchestrator.analyze()
+        orchestrator.analyze(generated=True)
+    elif analysis_level == 'incremental':
+        orchestrator.analyze(incremental=True, generated=True)
     if len(visuals_out) > 0:
         orchestrator.visualize()
+    if metrics_out:
+        metrics.export(metrics_out)
 
 
 if __name__ == '__main__':
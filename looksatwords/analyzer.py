@@ -1,139 +1,454 @@
+from .cache import LRUCache
+from .dataio import article_ids
 from .gatherer import GnewsGatherer
 
 from .validator import analyzed_data_schema
 
-from nltk.corpus import stopwords
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.stem import WordNetLemmatizer
-
-from nltk.corpus import wordnet
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
 from string import punctuation
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from os import makedirs, path
+from threading import Lock
+import re
 
-from pandas import concat, DataFrame
+from numpy import array, bincount, concatenate, float64, fromiter, int32
+from pandas import Categorical, concat, DataFrame, factorize, Series
 
 from .hud import hud
 
 
-# Initialize NLTK components
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
-sia = SentimentIntensityAnalyzer()
+# NLTK components, importing and loading them takes seconds so load_nltk does it on first use
+lemmatizer = None
+stop_words = None
+sia = None
+word_tokenize = None
+pos_tag = None
+nltk_lock = Lock()
+punctuation_chars = frozenset(punctuation)
+# WordNet parts of speech, as in nltk.corpus.wordnet
+ADJ, VERB, NOUN, ADV = 'a', 'v', 'n', 'r'
+
+# Publisher suffix (' - Publisher'), clean_text drops everything after it.
+# Any whitespace counts around the hyphen, line breaks are only whitespace between words
+text_end = re.compile(r'\s-\s')
+# Words, punctuation, hyphens and whitespace all separate them
+word_pattern = re.compile(r'[^\W_]+')
+
+# Memoized NLTK results, news vocabulary repeats so much that most lookups are hits.
+# Worker processes of the parallel mode each fill their own copies.
+lemma_cache = LRUCache(maxsize=2**17)
+tag_cache = LRUCache(maxsize=2**15)
+sentiment_cache = LRUCache(maxsize=2**16)
+caches = {'lemma': lemma_cache, 'tag': tag_cache, 'sentiment': sentiment_cache}
+
+# Number of texts sent to a worker process at a time in parallel mode
+default_chunksize = 256
 
 
 class Analyzer(GnewsGatherer):
     def __init__(self,
                  db_path='data.json',
                  dfs=None,
-                 analyzis_level='default'):
-        super().__init__(db_path=db_path, table_name='analyzer')
+                 analyzis_level='default',
+                 workers=1,
+                 chunksize=default_chunksize,
+                 backend='tinydb',
+                 keep_sentiment=True,
+                 cache_path=None):
+        """
+        :param workers: int, number of processes used by preprocess and analyze,
+        started on first use and reused until close
+        - 1: analyze in this process
+        - None: one process per CPU core
+        :param chunksize: int, number of texts dispatched to a worker at a time
+        :param keep_sentiment: bool, keep the {column}_sentiment columns of score dicts
+        next to the float score columns
+        :param cache_path: optional, str, directory the lemma, tag and sentiment caches
+        are loaded from, and saved to after analyze, with the values worker processes cached
+        """
+        super().__init__(db_path=db_path, table_name='analyzer', backend=backend)
         self.df_schema = analyzed_data_schema
         self.table_name = self.table_name + '_analyzer'
         self.words_df = None
+        self.word_frequencies = None
+        self.documents = None
+        self.workers = workers
+        self.chunksize = chunksize
+        self.executor = None
+        self.keep_sentiment = keep_sentiment
+        self.cache_path = cache_path
+        if cache_path is not None and path.exists(cache_path):
+            load_caches(cache_path)
         if dfs is not None:
             for df in dfs:
                 self.combine(df)
 
+    def pool(self):
+        """The process pool of the analyzer, started on first use, None with a single worker"""
+        if self.workers == 1:
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_worker, initargs=(self.cache_path is not None,)
+            )
+        return self.executor
+
+    def close(self):
+        """Shut the process pool down, the next parallel preprocess or analyze starts a new one"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
     @hud
     def build_words_df(self, hud):
-        words = []
-        task = hud.add_task("[purple]Analyzer:Building words DataFrame...", total=2*len(self.df))
-        for headline in self.df['headline']:
-            words.extend(headline.split())
-            hud.update(task, advance=1)
-        for description in self.df['description']:
-            words.extend(description.split())
+        """
+        Build self.words_df, one row per lowercased word of the headlines and descriptions.
+        The word column is categorical, each distinct word is stored once and rows hold
+        its integer id, and self.word_frequencies holds the count of each distinct word
+        """
+        task = hud.add_task("[purple]Analyzer:Building words DataFrame...", total=2)
+        vocabulary = {}
+        codes = []
+        for column in ['headline', 'description']:
+            codes.append(intern_words(self.df[column].fillna('').str.lower(), vocabulary))
             hud.update(task, advance=1)
-        self.words_df = DataFrame(words, columns=['word'])
-        self.words_df['word'] = self.words_df['word'].apply(lambda x: x.lower())
+        codes = concatenate(codes)
+        self.words_df = DataFrame({'word': Categorical.from_codes(codes, categories=list(vocabulary))})
+        self.word_frequencies = word_frequencies(self.words_df)
         return self.words_df
     
     @hud
     def preprocess(self, hud):
         task = hud.add_task("[purple]Analyzer:Preprocessing data...", total=len(self.df))
-        for i, row in self.df.iterrows():
-            self.df.at[i, 'headline'] = clean_text(row['headline'])
-            self.df.at[i, 'headline_cleaned'] = preprocess_text(row['headline'])
-            self.df.at[i, 'description_cleaned'] = preprocess_text(row['description'])
+        headlines = []
+        self.documents = {'headline': [], 'description': []}
+        rows = zip(self.df['headline'], self.df['description'])
+        for headline, (headline_document, description_document) in map_texts(
+            process_row,
+            rows,
+            workers=self.workers,
+            chunksize=self.chunksize,
+            executor=self.pool(),
+        ):
+            headlines.append(headline)
+            self.documents['headline'].append(headline_document)
+            self.documents['description'].append(description_document)
             hud.update(task, advance=1)
+        self.df['headline'] = headlines
+        for column, documents in self.documents.items():
+            self.df[f'{column}_cleaned'] = [document['cleaned'] for document in documents]
         return self.df
     
 
     @hud
     def analyze(self, hud):
         to_process = ['headline', 'description']
+        if self.documents is None:
+            self.preprocess()
         task = hud.add_task("[purple]Analyzer:Analyzing data...", total=3*len(to_process))
         for column in to_process:
-            hud.update(task, description=f"[purple]Analyzer:Analyzing {column}...")
-            apply_preprocessing_and_sentiment_analysis(self.df, f'{column}_cleaned', column)
+            documents = self.documents[column]
+            hud.update(task, description=f"[purple]Analyzer:Abstracting {column}...")
+            self.df[f'abstracted_{column}'] = [document['cleaned'] for document in documents]
             hud.update(task, advance=1)
-            hud.update(task, description=f"[purple]Analyzer:Counting words in {column}...")
-            apply_wordcount(self.df, f'{column}_cleaned', column)
+            hud.update(task, description=f"[purple]Analyzer:Analyzing sentiment in {column}...")
+            apply_sentiment_analysis(
+                self.df,
+                f'{column}_cleaned',
+                column,
+                workers=self.workers,
+                chunksize=self.chunksize,
+                executor=self.pool(),
+                keep_sentiment=self.keep_sentiment,
+            )
             hud.update(task, advance=1)
-            hud.update(task, description=f"[purple]Analyzer:Analyzing grammar in {column}...")
-            apply_grammar_analysis(self.df, f'{column}_cleaned', column)
+            hud.update(task, description=f"[purple]Analyzer:Counting words and grammar in {column}...")
+            apply_document_analysis(self.df, documents, column)
             hud.update(task, advance=1)
 
+        if self.cache_path is not None:
+            save_caches(self.cache_path)
         return self.df
     
+    @hud
+    def analyze_incremental(self, hud):
+        """
+        Preprocess and analyze only the articles of self.df that aren't in the analyzer table yet,
+        and save them to it. Articles are identified by their article_ids.
+        self.df becomes all of its articles analyzed, the others loaded from the analyzer table.
+        """
+        task = hud.add_task("[purple]Analyzer:Finding new articles...", total=1)
+        current = self.df.assign(article_id=article_ids(self.df)).drop_duplicates('article_id')
+        # Only the ids of the stored articles, then only the stored articles of self.df
+        stored = self.load(columns=['article_id'])
+        ids = set(stored['article_id']) & set(current['article_id']) if 'article_id' in stored.columns else set()
+        previous = self.load(where=('article_id', ids)) if ids else DataFrame(columns=['article_id'])
+        self.df = current[~current['article_id'].isin(previous['article_id'])].reset_index(drop=True)
+        self.documents = None
+        hud.update(task, advance=1)
+
+        if not self.df.empty:
+            self.preprocess()
+            self.analyze()
+            self.save()
+        order = {article_id: i for i, article_id in enumerate(current['article_id'])}
+        self.df = (
+            concat([previous, self.df], ignore_index=True)
+            .sort_values('article_id', key=lambda ids: ids.map(order))
+            .reset_index(drop=True)
+        )
+        return self.df
+
     def combine(self, df):
         self.df = concat([self.df, df])
+        self.documents = None
         return self.df
 
+def load_nltk():
+    """Import NLTK and load the components the analyzer uses, once"""
+    global lemmatizer, stop_words, sia, word_tokenize, pos_tag
+    if sia is not None:
+        return
+    with nltk_lock:
+        if sia is not None:
+            return
+        from nltk import pos_tag as tagger, word_tokenize as tokenizer
+        from nltk.corpus import stopwords
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        from nltk.stem import WordNetLemmatizer
+
+        lemmatizer = WordNetLemmatizer()
+        stop_words = frozenset(stopwords.words('english'))
+        word_tokenize, pos_tag = tokenizer, tagger
+        # Set last, the other threads take it to mean everything is loaded
+        sia = SentimentIntensityAnalyzer()
+
 def get_wordnet_pos(treebank_tag):
     """Map POS tag to first character used by WordNetLemmatizer"""
     if treebank_tag.startswith('J'):
-        return wordnet.ADJ
+        return ADJ
     elif treebank_tag.startswith('V'):
-        return wordnet.VERB
+        return VERB
     elif treebank_tag.startswith('N'):
-        return wordnet.NOUN
+        return NOUN
     elif treebank_tag.startswith('R'):
-        return wordnet.ADV
+        return ADV
     else:
-        return wordnet.NOUN  # by default, treat as noun
+        return NOUN  # by default, treat as noun
+
+def intern_words(texts, vocabulary):
+    """
+    Split texts into words, adding new words to vocabulary
+    :param vocabulary: dict, word to int id, in order of first occurrence
+    :return: int32 array of the id of each word
+    """
+    return fromiter(
+        (vocabulary.setdefault(word, len(vocabulary)) for text in texts for word in text.split()),
+        dtype=int32,
+    )
+
+def word_frequencies(words_df):
+    """Series of the count of each distinct word of words_df, most frequent first"""
+    words = words_df['word']
+    if words.dtype != 'category':
+        return words.value_counts()
+    counts = bincount(words.cat.codes.to_numpy(), minlength=len(words.cat.categories))
+    return Series(counts, index=words.cat.categories, name='count').sort_values(ascending=False, kind='stable')
+
+def cache_stats():
+    """Size, hits, misses and hit rate of the lemma, tag and sentiment caches"""
+    return {name: cache.stats() for name, cache in caches.items()}
+
+def save_caches(cache_path):
+    makedirs(cache_path, exist_ok=True)
+    for name, cache in caches.items():
+        cache.save(path.join(cache_path, f'{name}.json'))
+
+def load_caches(cache_path):
+    for name, cache in caches.items():
+        if path.exists(path.join(cache_path, f'{name}.json')):
+            cache.load(path.join(cache_path, f'{name}.json'))
+
+def lemmatize(word, pos='n'):
+    """Memoized lemmatizer.lemmatize"""
+    lemma = lemma_cache.get((word, pos))
+    if lemma is None:
+        load_nltk()
+        lemma = lemma_cache.set((word, pos), lemmatizer.lemmatize(word, pos))
+    return lemma
+
+def tag_text(text):
+    """Tokenize, lowercase and POS-tag text, keeping only words and punctuation. Memoized"""
+    tagged = tag_cache.get(text)
+    if tagged is None:
+        load_nltk()
+        tokens = [
+            word for word in map(str.lower, word_tokenize(text))
+            if word.isalpha() or word in punctuation_chars
+        ]
+        tagged = tag_cache.set(text, pos_tag(tokens))
+    return tagged
+
+def process_text(text):
+    """
+    Tokenize and tag text exactly once and derive everything the analyzer needs from it:
+    - cleaned: lemmatized text without stopwords
+    - wordcount: number of words in the cleaned text
+    - one count per lowercased pos_groups key, from the tags of the kept words
+    """
+    load_nltk()
+    lemmas = []
+    for word, tag in tag_text(text):
+        lemma = lemmatize(word, get_wordnet_pos(tag))
+        if lemma not in stop_words:
+            lemmas.append((lemma, tag))
+    cleaned = " ".join(lemma for lemma, _ in lemmas)
+    document = {'cleaned': cleaned, 'wordcount': len(cleaned.split())}
+    document.update(count_pos_groups(lemmas))
+    return document
 
 def preprocess_text(text):
-    tokens = word_tokenize(text)
-    tokens = [word.lower() for word in tokens]
-    tokens = [word for word in tokens if word.isalpha() or word in punctuation]
-    pos_tags = pos_tag(tokens)
-    tokens = [lemmatizer.lemmatize(word, get_wordnet_pos(pos)) for word, pos in pos_tags]
-    tokens = [word for word in tokens if word not in stop_words]
-    return " ".join(tokens)
+    return process_text(text)['cleaned']
+
+def map_distinct(func, texts):
+    """Map func over a Series of texts, calling it once per distinct text"""
+    codes, uniques = factorize(texts, use_na_sentinel=False)
+    results = array([func(text) for text in uniques] or [None], dtype=object)
+    return Series(results[codes], index=texts.index, name=texts.name)
+
+def preprocess_texts(texts):
+    """preprocess_text over a Series of texts"""
+    return map_distinct(preprocess_text, texts)
+
+def clean_texts(texts):
+    """clean_text over a Series of texts"""
+    return map_distinct(clean_text, texts)
+
+def process_row(row):
+    """Clean a (headline, description) pair and process both texts"""
+    headline, description = row
+    return clean_text(headline), (process_text(headline), process_text(description))
+
+def init_worker(collect=False):
+    """
+    Load the lazily loaded NLTK components once when a worker process starts
+    :param collect: bool, track the values its caches gain, for map_batch to send them back
+    """
+    load_nltk()
+    lemmatizer.lemmatize('words')
+    sia.polarity_scores('words')
+    for cache in caches.values():
+        if collect:
+            cache.track()
+        cache.drain()
+
+def drain_caches():
+    """{cache name: drained} of the caches, see LRUCache.drain"""
+    return {name: cache.drain() for name, cache in caches.items()}
+
+def merge_caches(entries):
+    """Add what drain_caches drained, e.g. in a worker process, to the caches"""
+    for name, drained in entries.items():
+        caches[name].merge(drained)
+
+def map_batch(func, batch):
+    """func over batch, and what the caches gained meanwhile, see drain_caches"""
+    results = [func(text) for text in batch]
+    return results, drain_caches()
+
+def batched(texts, size):
+    texts = iter(texts)
+    while batch := list(islice(texts, size)):
+        yield batch
+
+def map_texts(func, texts, workers=1, chunksize=default_chunksize, executor=None, collect=False):
+    """
+    Lazily map func over texts, in original order.
+    The hits and misses of the caches of the worker processes are added to the caches
+    of this process, and so are their values if the workers collect them
+    :param workers: int, 1 to map in this process, otherwise the size of the process pool
+    (None for one process per CPU core) that batches of chunksize texts are dispatched to
+    :param executor: optional, ProcessPoolExecutor started with init_worker to dispatch to,
+    instead of a pool of workers processes started for this call
+    :param collect: bool, whether the pool started for this call collects the values its
+    caches gain, so save_caches saves them, see init_worker
+    """
+    if executor is not None:
+        for batch, entries in executor.map(map_batch, repeat(func), batched(texts, chunksize)):
+            merge_caches(entries)
+            yield from batch
+        return
+    if workers == 1:
+        yield from map(func, texts)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(collect,)) as executor:
+        yield from map_texts(func, texts, chunksize=chunksize, executor=executor)
 
 def get_sentiment_scores(text):
-    return sia.polarity_scores(text)
+    # Memoized, the returned dict is shared and must not be modified
+    scores = sentiment_cache.get(text)
+    if scores is None:
+        load_nltk()
+        scores = sentiment_cache.set(text, sia.polarity_scores(text))
+    return scores
 
 def analyze_sentiment(headline):
-    sentiment_analyzer = SentimentIntensityAnalyzer()
-    return sentiment_analyzer.polarity_scores(headline)
+    load_nltk()
+    return sia.polarity_scores(headline)
 
 def clean_text(text):
-    # Remove stopwords
-    text = ' '.join([word for word in text.split() if word.lower() not in stop_words])
-    # Remove publisher title from headline
-    text = text.split(' - ')[0]
-    # Retain only first line
-    text = text.split('\n')[0]
-    # Lemmatize words
-    text = ' '.join([lemmatizer.lemmatize(word) for word in text.split()])
-    # Remove punctuation
-    text = text.replace('[^\w\s]', '')
-    # Remove extra spaces
-    text = ' '.join(text.split())
-    # Remove hyphens
-    text = text.replace('-', ' ')
-    return text
-
-
-def apply_sentiment_analysis(df, column_name, prefix):
-    df[f'{prefix}_sentiment'] = df[column_name].apply(get_sentiment_scores)
-    df[f'{prefix}_positive'] = df[f'{prefix}_sentiment'].apply(lambda x: float(x['pos']))
-    df[f'{prefix}_negative'] = df[f'{prefix}_sentiment'].apply(lambda x: float(x['neg']))
-    df[f'{prefix}_neutral'] = df[f'{prefix}_sentiment'].apply(lambda x: float(x['neu']))
-    df[f'{prefix}_compound'] = df[f'{prefix}_sentiment'].apply(lambda x: float(x['compound']))
+    """
+    Normalize a headline in one pass: drop the publisher suffix,
+    split it into words on punctuation, hyphens and whitespace,
+    drop stopwords and lemmatize the other words
+    """
+    load_nltk()
+    text = text_end.split(text, maxsplit=1)[0]
+    return ' '.join([
+        lemmatize(word) for word in word_pattern.findall(text) if word.lower() not in stop_words
+    ])
+
+
+sentiment_columns = {'pos': 'positive', 'neg': 'negative', 'neu': 'neutral', 'compound': 'compound'}
+
+def apply_sentiment_analysis(
+    df,
+    column_name,
+    prefix,
+    workers=1,
+    chunksize=default_chunksize,
+    keep_sentiment=True,
+    executor=None,
+    collect=False,
+):
+    """
+    Score each distinct text of df[column_name] once, and write the scores to
+    float64 {prefix}_positive, _negative, _neutral and _compound columns
+    :param keep_sentiment: bool, also write the score dicts to {prefix}_sentiment
+    :param executor: optional, process pool to score with, see map_texts
+    :param collect: bool, whether a pool started for this call collects the values
+    of its sentiment cache, see map_texts
+    """
+    codes, texts = factorize(df[column_name], use_na_sentinel=False)
+    scores = list(
+        map_texts(
+            get_sentiment_scores,
+            texts,
+            workers=workers,
+            chunksize=chunksize,
+            executor=executor,
+            collect=collect,
+        )
+    )
+    table = array(
+        [[score[key] for key in sentiment_columns] for score in scores], dtype=float64
+    ).reshape(-1, len(sentiment_columns))
+    if keep_sentiment:
+        df[f'{prefix}_sentiment'] = [scores[code] for code in codes]
+    elif f'{prefix}_sentiment' in df.columns:
+        del df[f'{prefix}_sentiment']
+    for i, suffix in enumerate(sentiment_columns.values()):
+        df[f'{prefix}_{suffix}'] = table[codes, i]
 
 def apply_wordcount(df, column_name, prefix):
     df[f'{prefix}_wordcount'] = df[column_name].apply(lambda x: len(x.split()))
@@ -141,7 +456,7 @@ def apply_wordcount(df, column_name, prefix):
 @hud
 def apply_preprocessing_and_sentiment_analysis(df, column_name, prefix, hud):
     pre_task = hud.add_task(f"[purple]Analyzer:Preprocessing {prefix}...", total=1)
-    df[f'abstracted_{prefix}'] = df[column_name].apply(preprocess_text)
+    df[f'abstracted_{prefix}'] = preprocess_texts(df[column_name])
     hud.update(pre_task, advance=1)
     sentiment_task = hud.add_task(f"[purple]Analyzer:Analyzing sentiment in {prefix}...", total=1)
     apply_sentiment_analysis(df, f'{prefix}_cleaned', prefix)
@@ -187,6 +502,22 @@ pos_groups = {
     'Interjection': ['UH'],
 }
 
+def count_pos_groups(tagged):
+    """Count (word, tag) pairs per lowercased pos_groups key"""
+    counts = {pos_group.lower(): 0 for pos_group in pos_groups}
+    for _, tag in tagged:
+        if tag in pos:
+            counts[pos[tag].lower()] += 1
+    return counts
+
 def apply_grammar_analysis(df, column_name, prefix):
-    for pos_group, pos_tags in pos_groups.items():
-        df[f'{prefix}_{pos_group.lower()}'] = df[column_name].apply(lambda x: len([word for word, pos in pos_tag(word_tokenize(x)) if pos in pos_tags]))
+    load_nltk()
+    counts = [count_pos_groups(pos_tag(word_tokenize(text))) for text in df[column_name]]
+    for pos_group in pos_groups:
+        df[f'{prefix}_{pos_group.lower()}'] = [count[pos_group.lower()] for count in counts]
+
+def apply_document_analysis(df, documents, prefix):
+    """Expand documents from process_text into word count and grammar columns"""
+    df[f'{prefix}_wordcount'] = [document['wordcount'] for document in documents]
+    for pos_group in pos_groups:
+        df[f'{prefix}_{pos_group.lower()}'] = [document[pos_group.lower()] for document in documents]
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+
+
+class CacheMiss(LookupError):
+    """Raised by a replaying cache when a key was never cached"""
+
+
+class LRUCache:
+    """
+    In memory cache holding at most maxsize values, evicting the least recently used.
+    Can be saved to and loaded from a JSON file to carry it over between runs.
+    """
+
+    def __init__(self, maxsize=2**16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.data = OrderedDict()
+        # Values set since the last drain, while tracked
+        self.added = None
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+            if self.added is not None:
+                self.added[key] = value
+        return value
+
+    def track(self):
+        """Record the values set from now on, for drain"""
+        with self.lock:
+            self.added = {}
+
+    def drain(self):
+        """
+        The hits and misses since the last drain, and while tracked the (key, value) pairs set,
+        as {'items': [(key, value)], 'hits': int, 'misses': int}, for merge
+        """
+        with self.lock:
+            drained = {'items': [], 'hits': self.hits, 'misses': self.misses}
+            if self.added is not None:
+                drained['items'], self.added = list(self.added.items()), {}
+            self.hits = self.misses = 0
+        return drained
+
+    def merge(self, drained):
+        """Add the values and counts drained from another cache, e.g. of a worker process"""
+        self.update(drained['items'])
+        with self.lock:
+            self.hits += drained['hits']
+            self.misses += drained['misses']
+        return self
+
+    def update(self, items):
+        """Set each (key, value) pair of items"""
+        for key, value in items:
+            self.set(key, value)
+        return self
+
+    def get_or_set(self, key, func):
+        """Return the cached value of key, or cache and return func()"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.set(key, func())
+        return value
+
+    def __len__(self):
+        return len(self.data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path):
+        """Save the cached values to a JSON file, tuple keys and values are saved as lists"""
+        with self.lock:
+            items = list(self.data.items())
+        with open(path, 'w') as f:
+            json.dump(items, f)
+
+    def load(self, path):
+        """Add the values saved to a JSON file by save, list keys are loaded as tuples"""
+        with open(path) as f:
+            items = json.load(f)
+        return self.update((tuple(key) if isinstance(key, list) else key, value) for key, value in items)
+
+
+class DiskCache:
+    """
+    Persistent cache of JSON serializable values in an SQLite file,
+    keyed by a hash of the request that produced them.
+    When it holds more than max_entries, the least recently used entries are evicted.
+
+    :param path: str, path of the SQLite file
+    :param max_entries: int, maximum number of cached values
+    :param mode: str, how values are looked up
+    - readwrite: serve cached values, compute and cache the others (default)
+    - replay: only serve cached values, raise CacheMiss for the others
+    - refresh: compute and cache every value, ignoring cached ones
+    """
+
+    modes = ['readwrite', 'replay', 'refresh']
+
+    def __init__(self, path='cache.sqlite', max_entries=100_000, mode='readwrite'):
+        if mode not in self.modes:
+            raise ValueError(f"Invalid mode '{mode}'. Valid modes are: {', '.join(self.modes)}")
+        self.path = path
+        self.max_entries = max_entries
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, used INTEGER)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS cache_used ON cache (used)')
+        self.clock = self.connection.execute('SELECT MAX(used) FROM cache').fetchone()[0] or 0
+
+    @staticmethod
+    def key(*request):
+        """Hash a JSON serializable request into a cache key"""
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def tick(self):
+        self.clock += 1
+        return self.clock
+
+    def get(self, key, default=None):
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            with self.connection:
+                self.connection.execute('UPDATE cache SET used = ? WHERE key = ?', (self.tick(), key))
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (key, json.dumps(value), self.tick())
+            )
+            self.connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+        return value
+
+    def get_or_set(self, key, func):
+        """Return the cached value of key, or cache and return func() depending on the mode"""
+        if self.mode != 'refresh':
+            missing = object()
+            value = self.get(key, missing)
+            if value is not missing:
+                return value
+            if self.mode == 'replay':
+                raise CacheMiss(f'{key} is not in {self.path}')
+        else:
+            self.misses += 1
+        return self.set(key, func())
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from queue import Queue
+from threading import BoundedSemaphore, Lock, Thread
+from time import monotonic, sleep
+
+
+class HostLimiter:
+    """
+    Limits requests per host, across all threads sharing the limiter.
+    :param max_concurrent: int, maximum number of requests in flight to a host
+    :param min_interval: float, minimum seconds between the starts of two requests to a host
+    """
+
+    def __init__(self, max_concurrent=8, min_interval=0.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.lock = Lock()
+        self.semaphores = {}
+        self.next_start = {}
+
+    @contextmanager
+    def __call__(self, host):
+        with self.lock:
+            semaphore = self.semaphores.setdefault(host, BoundedSemaphore(self.max_concurrent))
+        with semaphore:
+            with self.lock:
+                now = monotonic()
+                start = max(now, self.next_start.get(host, now))
+                self.next_start[host] = start + self.min_interval
+            if start > now:
+                sleep(start - now)
+            yield
+
+
+def retry(func, retries=2, exceptions=(Exception,), backoff=1.0, retryable=None):
+    """
+    Call func, calling it again up to retries times if it raises one of exceptions
+    :param backoff: float, seconds to wait before the first retry, doubled for each retry after
+    :param retryable: optional, function of a raised exception, False for those not to retry
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except exceptions as e:
+            if attempt == retries or (retryable is not None and not retryable(e)):
+                raise
+            sleep(backoff * 2**attempt)
+
+
+def thread_map(func, items, max_workers=8):
+    """Map func over items on a thread pool, yielding results in the order of items"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(func, items)
+
+
+def thread_map_unordered(func, items, max_workers=8):
+    """Map func over items on a thread pool, yielding each result as soon as it is ready"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in as_completed([executor.submit(func, item) for item in items]):
+            yield future.result()
+
+
+def background(iterable, maxsize=4):
+    """
+    Iterate iterable on a background thread, yielding its items through a queue
+    of at most maxsize items, so the producer runs ahead of the consumer by at most maxsize
+    """
+    queue = Queue(maxsize=maxsize)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                queue.put((item, None))
+        except BaseException as e:
+            queue.put((None, e))
+        queue.put((done, None))
+
+    Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = queue.get()
+        if error is not None:
+            raise error
+        if item is done:
+            return
+        yield item
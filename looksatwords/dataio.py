@@ -1,9 +1,10 @@
-from tinydb import TinyDB
-from pandas import DataFrame
+from pandas import DataFrame, to_datetime
 from os import path, makedirs
+from hashlib import sha1
 from rich import print
 
 from .hud import hud
+from .storage import get_storage
 
 import time
 def get_time():
@@ -18,30 +19,108 @@ def get_datetime():
 def get_timestamp():
     return time.strftime("%Y%m%d%H%M%S", time.localtime())
 
+def article_ids(df):
+    """Stable identity of each article of df: a hash of its url and published date"""
+    keys = df['url'].astype(str) + '\n' + df['published date'].astype(str)
+    return keys.map(lambda key: sha1(key.encode()).hexdigest())
+
+def published_dates(df):
+    """
+    UTC datetime of each article's published date, NaT where it can't be parsed.
+    Gathered articles have RFC 2822 dates, generated ones ISO 8601 dates, naive ones are taken as UTC
+    """
+    published = df['published date']
+    dates = to_datetime(published, format='%a, %d %b %Y %H:%M:%S %Z', utc=True, errors='coerce')
+    iso = to_datetime(published.where(dates.isna()), format='ISO8601', utc=True, errors='coerce')
+    return dates.where(dates.notna(), iso)
+
+def publisher_titles(df):
+    """Title of each article's publisher, which is a dict for gathered articles and a str for generated ones"""
+    return df['publisher'].map(lambda p: p.get('title') if isinstance(p, dict) else p).astype(str)
+
 class DataIO():
 
-    def __init__(self, db_path='data.json', table_name='io'):
+    def __init__(self, db_path='data.json', table_name='io', backend='tinydb', validation='full', validation_rows=1000):
+        """
+        :param backend: storage backend of the table, see storage.get_storage
+        - tinydb: TinyDB JSON file at db_path (default)
+        - parquet: Parquet files, one per save, loaded column by column
+        - sqlite: SQLite database
+        - Storage: any storage.Storage instance
+        :param validation: str, rows validate checks, see validator.validate
+        - full: all rows (default)
+        - new: the rows added to self.df since the last validate
+        - head, random: the first or validation_rows random rows, for trusted sources
+        - off: none
+        :param validation_rows: int, number of rows validated by head and random
+        """
         self.df = DataFrame()
         self.db_path = db_path
-        with open(db_path, 'a') as f:
-            pass
-        self.db = TinyDB(self.db_path) 
+        self.storage = get_storage(backend, db_path)
         self.table_name = table_name
+        self.df_schema = None
+        self.validation = validation
+        self.validation_rows = validation_rows
+        # Number of rows at the start of self.df validated so far, and their first and last rows
+        self.validated_rows = 0
+        self.validated_ends = None
+        # Called with the saved rows after each save, see add_save_hook
+        self.save_hooks = []
+
+    def add_save_hook(self, hook):
+        """Call hook with the DataFrame of rows saved, after each save"""
+        self.save_hooks.append(hook)
+
+    def validate(self, mode=None):
+        """
+        Validate self.df against self.df_schema
+        :param mode: optional, validation mode of this call, self.validation if None
+        """
+        from .validator import validate
+
+        if self.df_schema is None:
+            return self.df
+        mode = mode or self.validation
+        if self.validated_rows and self.validated_ends != self.ends(self.validated_rows):
+            # self.df was replaced rather than appended to
+            self.validated_rows = 0
+        self.df = validate(
+            self.df,
+            self.df_schema,
+            mode=mode,
+            n=self.validation_rows,
+            start=self.validated_rows,
+        )
+        if mode in ('full', 'new'):
+            self.validated_rows = len(self.df)
+            self.validated_ends = self.ends(self.validated_rows)
+        return self.df
+
+    def ends(self, n):
+        """The first and nth rows of self.df, None if it has fewer than n rows"""
+        if not 0 < n <= len(self.df):
+            return None
+        return self.df.iloc[[0, n - 1]].to_dict('records')
 
     @hud
-    def load(self, hud):
+    def load(self, hud, columns=None, where=None):
+        """
+        Load the table into self.df
+        :param columns: optional, list of columns to load, all columns if None
+        :param where: optional, (column, values) to only load the rows whose column is in values
+        """
         load_task = hud.add_task('[red]IO:Loading data...', total=1)
-        table = self.db.table(self.table_name)
-        self.df = DataFrame(table.all())
+        self.df = self.storage.load(self.table_name, columns=columns, where=where)
         hud.update(load_task, advance=1)
         return self.df
     
     @hud
     def save(self, hud):
         save_task = hud.add_task('[red]IO:Saving data...', total=len(self.df))
-        for i, row in self.df.iterrows():
-            hud.update(save_task, advance=1)
-            self.db.table(self.table_name).insert(row.to_dict())
+        self.storage.append(self.table_name, self.df)
+        for hook in self.save_hooks:
+            hook(self.df)
+        hud.update(save_task, advance=len(self.df))
         return self.df
 
     
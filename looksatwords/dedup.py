@@ -0,0 +1,175 @@
+from hashlib import blake2b, sha1
+
+import numpy as np
+from pandas import DataFrame
+
+from .dataio import DataIO, article_ids
+from .hud import hud
+
+# Mersenne prime modulus of the MinHash permutations
+prime = (1 << 31) - 1
+
+
+def content_hashes(df):
+    """Hash of each article's headline and description, ignoring case and whitespace"""
+    texts = df['headline'].astype(str) + '\n' + df['description'].astype(str)
+    return texts.map(lambda text: sha1(' '.join(text.lower().split()).encode()).hexdigest())
+
+
+def shingles(text, size=2):
+    """Set of the runs of size consecutive words of text"""
+    words = text.lower().split()
+    return {' '.join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+class MinHash:
+    """
+    MinHash signatures, whose fraction of equal values estimates the Jaccard similarity
+    of the shingles of two texts, bucketed into bands for locality sensitive hashing
+    """
+
+    def __init__(self, num_perm=64, bands=16, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, prime, num_perm, dtype=np.int64)
+        self.b = rng.integers(0, prime, num_perm, dtype=np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+
+    def signature(self, text):
+        hashes = np.array(
+            [
+                int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), 'little') % prime
+                for shingle in shingles(text)
+            ],
+            dtype=np.int64,
+        )
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % prime).min(axis=1)
+
+    def band_keys(self, signature):
+        return [
+            (band, tuple(signature[band * self.rows : (band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+
+class Deduplicator(DataIO):
+    """
+    Drops articles that were already seen, in the same or an earlier batch or run.
+    Seen articles are indexed by article_id (url and published date) and by content hash,
+    and optionally by MinHash signature of their headline to drop near duplicates.
+    The index is persisted in its own table, so it carries over between runs.
+    Articles are only persisted as seen by commit, once they are saved, so articles of a run
+    that fails before saving them aren't dropped as duplicates by the next run.
+    """
+
+    def __init__(
+        self,
+        db_path='data.json',
+        table_name='dedup',
+        near_duplicates=False,
+        threshold=0.8,
+        num_perm=64,
+        bands=16,
+        **kwargs,
+    ):
+        """
+        :param near_duplicates: bool, also drop articles with near duplicate headlines
+        :param threshold: float, estimated Jaccard similarity of headline word pairs
+        above which two headlines are near duplicates
+        :param num_perm: int, number of MinHash permutations
+        :param bands: int, number of LSH bands num_perm is split into
+        """
+        super().__init__(db_path=db_path, table_name=table_name, **kwargs)
+        self.table_name = self.table_name + '_index'
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.minhash = MinHash(num_perm=num_perm, bands=bands)
+        self.ids = set()
+        self.hashes = set()
+        self.buckets = {}
+        # Index rows of the articles kept but not committed yet, by article_id
+        self.pending = {}
+        self.stats = {
+            'seen': 0,
+            'kept': 0,
+            'url_duplicates': 0,
+            'content_duplicates': 0,
+            'near_duplicates': 0,
+        }
+        index = self.load()
+        for row in index.to_dict('records'):
+            self.index(row)
+        self.df = DataFrame()
+
+    def attach(self, dataio):
+        """Commit the articles dataio saves from now on"""
+        if self.commit not in dataio.save_hooks:
+            dataio.add_save_hook(self.commit)
+        return self
+
+    def commit(self, df=None):
+        """
+        Save the index rows of the kept articles of df, once they are saved
+        :param df: optional, DataFrame of saved articles, all kept articles if None
+        """
+        if not self.pending:
+            return DataFrame()
+        if df is not None and (df.empty or not {'url', 'published date'} <= set(df.columns)):
+            # Nothing was gathered, e.g. a query without results
+            return DataFrame()
+        ids = self.pending.keys() if df is None else set(article_ids(df)) & self.pending.keys()
+        self.df = DataFrame([self.pending.pop(article_id) for article_id in list(ids)])
+        if not self.df.empty:
+            self.save()
+        return self.df
+
+    def index(self, row):
+        self.ids.add(row['article_id'])
+        self.hashes.add(row['content_hash'])
+        signature = row.get('signature')
+        if isinstance(signature, list):
+            signature = np.array(signature, dtype=np.int64)
+            for key in self.minhash.band_keys(signature):
+                self.buckets.setdefault(key, []).append(signature)
+
+    def is_near_duplicate(self, signature):
+        return any(
+            (candidate == signature).mean() >= self.threshold
+            for key in self.minhash.band_keys(signature)
+            for candidate in self.buckets.get(key, [])
+        )
+
+    @hud
+    def dedup(self, df, hud):
+        """
+        Return the rows of df not seen before, and add them to the index,
+        to be persisted by commit once they are saved
+        """
+        if df.empty:
+            return df
+        task = hud.add_task("[blue]Dedup:Dropping duplicate articles...", total=len(df))
+        keep = []
+        for article_id, content_hash, headline in zip(
+            article_ids(df), content_hashes(df), df['headline'].astype(str)
+        ):
+            self.stats['seen'] += 1
+            signature = self.minhash.signature(headline) if self.near_duplicates else None
+            if article_id in self.ids:
+                self.stats['url_duplicates'] += 1
+                keep.append(False)
+            elif content_hash in self.hashes:
+                self.stats['content_duplicates'] += 1
+                keep.append(False)
+            elif signature is not None and self.is_near_duplicate(signature):
+                self.stats['near_duplicates'] += 1
+                keep.append(False)
+            else:
+                self.stats['kept'] += 1
+                keep.append(True)
+                row = {'article_id': article_id, 'content_hash': content_hash}
+                if signature is not None:
+                    row['signature'] = signature.tolist()
+                self.index(row)
+                self.pending[article_id] = row
+            hud.update(task, advance=1)
+        return df[keep]
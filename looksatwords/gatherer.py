@@ -1,10 +1,14 @@
 from gnews import GNews
 from pandas import DataFrame, concat
 
+from .concurrency import HostLimiter, thread_map, thread_map_unordered
 from .dataio import DataIO
 from .hud import hud
 from .validator import gnews_data_schema
 
+# Shared by all gatherers, so concurrent gatherers don't flood a host together
+host_limiter = HostLimiter(max_concurrent=8, min_interval=0.1)
+
 
 class GnewsQuery:
     def __init__(
@@ -29,65 +33,97 @@ class GnewsQuery:
         # return non none values
         return ', '.join([f'{k}' for k, v in self.__dict__.items() if v is not None])
 
+    def facets(self):
+        """Return the (name, value) pairs of the query that are set"""
+        return [
+            (k, value)
+            for k, value in self.__dict__.items()
+            if value is not None and k is not None and value is not False
+        ]
+
 
 class Gatherer(DataIO):
-    def __init__(self, db_path, table_name, raw_data_schema=None, n=1):
-        super().__init__(db_path=db_path, table_name=table_name)
+    def __init__(self, db_path, table_name, raw_data_schema=None, n=1, backend='tinydb', **kwargs):
+        super().__init__(db_path=db_path, table_name=table_name, backend=backend, **kwargs)
         self.df_schema = raw_data_schema
         self.table_name = str(table_name) + '_gatherer'
         self.query = (None,)
         self.n = n
 
-    def validate(self):
-        self.df = self.df_schema.validate(self.df)
-        return self.df
-
 
 class GnewsGatherer(Gatherer):
+    gnews_host = 'news.google.com'
+
     def __init__(
         self,
         q: GnewsQuery = GnewsQuery(top=True),
         db_path='data.json',
         table_name='gnews',
+        max_workers=8,
+        limiter=host_limiter,
         **kwargs,
     ):
+        """
+        :param max_workers: int, maximum number of query facets gathered at once
+        :param limiter: HostLimiter, limits requests to Google News across gatherers
+        """
         super().__init__(db_path=db_path, table_name=table_name, **kwargs)
         self.df_schema = gnews_data_schema
         self.table_name = 'gnews'
         self.gnews = GNews(max_results=self.n)
         self.query = q
+        self.max_workers = max_workers
+        self.limiter = limiter
 
     @hud
     def gather(self, hud):
-        n = sum(
-            [
-                1
-                for k, value in self.query.__dict__.items()
-                if value is not None and k is not None and value is not False
-            ]
-        )
         if self.query is not None:
+            facets = self.query.facets()
             task_gather_batch = hud.add_task(
-                f"[yellow]Gatherer:Gathering batch...", total=n
+                f"[yellow]Gatherer:Gathering batch...", total=len(facets)
             )
-            for k, value in self.query.__dict__.items():
-                if value is not None and k is not None and value is not False:
-                    task_gather = hud.add_task(
-                        f"[yellow]Gatherer:Gathering {k}={value}...", total=1
-                    )
-                    self.df = DataFrame(self.gnews.get_news(f'{k}={value}'))
-                    hud.update(task_gather, advance=1)
-                    hud.update(task_gather_batch, advance=1)
+            articles = []
+            for df in thread_map(self.gather_facet, facets, max_workers=self.max_workers):
+                articles.append(df)
+                hud.update(task_gather_batch, advance=1)
+            if articles:
+                self.df = concat(articles, ignore_index=True)
         else:
             task_gather = hud.add_task(
-                f"[yellow]{ n }Gatherer:Gathering top articles...", total=1
+                f"[yellow]Gatherer:Gathering top articles...", total=1
             )
-            self.df = DataFrame(self.gnews.get_top_news())
+            with self.limiter(self.gnews_host):
+                self.df = DataFrame(self.gnews.get_top_news()).assign(query='top=True')
             hud.update(task_gather, advance=1)
 
         self.df.rename(columns={'title': 'headline'}, inplace=True)
         return self.df
 
+    def iter_gather(self):
+        """
+        Yield the articles of each query facet as soon as they are gathered,
+        without keeping them in self.df
+        """
+        if self.query is None:
+            with self.limiter(self.gnews_host):
+                df = DataFrame(self.gnews.get_top_news()).assign(query='top=True')
+            yield df.rename(columns={'title': 'headline'})
+            return
+        for df in thread_map_unordered(
+            self.gather_facet, self.query.facets(), max_workers=self.max_workers
+        ):
+            yield df.rename(columns={'title': 'headline'})
+
+    @hud
+    def gather_facet(self, facet, hud):
+        """Gather the articles of a (name, value) query facet, recording it in their query column"""
+        k, value = facet
+        task_gather = hud.add_task(f"[yellow]Gatherer:Gathering {k}={value}...", total=1)
+        with self.limiter(self.gnews_host):
+            df = DataFrame(self.gnews.get_news(f'{k}={value}')).assign(query=f'{k}={value}')
+        hud.update(task_gather, advance=1)
+        return df
+
     def get_news(self, keyword=None, top=True, location=None, topic=None, site=None):
         """
         Retrieves articles articles based on specified parameters.
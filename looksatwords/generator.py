@@ -1,16 +1,19 @@
 from datetime import datetime
+from random import randrange
 
 from pandas import DataFrame
 
+from .concurrency import thread_map
 from .dataio import DataIO
 from .hud import H, hud
 from .llm import generate_news_description, generate_news_headline, host_url, publisher
+from .logs import log
 from .validator import gnews_data_schema
 
 
 class Generator(DataIO):
-    def __init__(self, db_path='data.json', table_name='generator', n=1):
-        super().__init__(db_path=db_path, table_name=table_name)
+    def __init__(self, db_path='data.json', table_name='generator', n=1, backend='tinydb', **kwargs):
+        super().__init__(db_path=db_path, table_name=table_name, backend=backend, **kwargs)
         self.df_schema = gnews_data_schema
         self.table_name = self.table_name + '_generator'
         self.n = n
@@ -18,18 +21,29 @@ class Generator(DataIO):
     def generate(self):
         pass
 
-    def validate(self):
-        self.df = self.df_schema.validate(self.df)
-        return self.df
-
 
 class GnewsGenerator(Generator):
     def __init__(
-        self, seedword=None, db_path='data.json', table_name='generatednews', **kwargs
+        self,
+        seedword=None,
+        db_path='data.json',
+        table_name='generatednews',
+        concurrency=1,
+        seed=None,
+        **kwargs,
     ):
+        """
+        :param concurrency: int, maximum number of articles being generated at once
+        :param seed: int, model seed of the first article, the nth article uses seed + n.
+        Generating again with the same seed gives the same articles, or replays them from llm.cache.
+        Random if None, and logged either way, so a generation can be reproduced by passing its seed.
+        """
         super().__init__(db_path=db_path, table_name=table_name, **kwargs)
         self.table_name = self.table_name + '_gennews'
         self.seedword = seedword
+        self.concurrency = concurrency
+        self.seed = randrange(2**31) if seed is None else seed
+        log.info(f'Generator: {self.table_name} seed {self.seed}')
 
     @hud
     def generate(self, hud):
@@ -42,17 +56,18 @@ class GnewsGenerator(Generator):
         return self.df
 
     @hud
-    def generate_news(self, hud):
+    def generate_news(self, hud, index=0):
+        options = {'seed': self.seed + index}
 
         task_headline = hud.add_task(
             f"[green]Generator:Generating new headline", total=1
         )
-        headline = generate_news_headline(seed=self.seedword)
+        headline = generate_news_headline(seed=self.seedword, options=options)
         hud.update(task_headline, advance=1)
         task_description = hud.add_task(
             f"[green]Generator:Generating description for {headline[:16]}...", total=1
         )
-        description = generate_news_description(headline)
+        description = generate_news_description(headline, options=options)
         hud.update(task_description, advance=1)
 
         date = datetime.now().isoformat()
@@ -61,9 +76,13 @@ class GnewsGenerator(Generator):
 
     @hud
     def generate_news_batch(self, hud, task, n=1):
+        # Each article asks for its headline then its description, while up to
+        # self.concurrency articles are in flight on the shared llm client
         news = []
-        for _ in range(n):
-            news.append(self.generate_news())
+        for article in thread_map(
+            lambda index: self.generate_news(index=index), range(n), max_workers=self.concurrency
+        ):
+            news.append(article)
             hud.update(task, advance=1)
 
         return news
@@ -7,9 +7,15 @@ from rich.text import Text
 from rich.console import Console
 from rich.tree import Tree
 
+from contextlib import contextmanager
 from functools import wraps
-
+from os import environ
+from threading import Lock, local
 import json
+import time
+
+from .logs import log
+from .metrics import count_rows, metrics
 
 def parse_json_to_tree(json, tree=Tree('db')):
     if isinstance(json, dict):
@@ -19,11 +25,126 @@ def parse_json_to_tree(json, tree=Tree('db')):
             return tree
 
 
+class LogProgress:
+    """
+    Stands in for the Progress of the HUD in headless mode, logging progress instead:
+    a line per task at most every interval seconds, and one when it completes,
+    at debug level if it took less than interval seconds.
+    Tasks are dropped when they complete, or when the scope they were added in exits.
+    """
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.tasks = {}
+        self.next_id = 0
+        self.lock = Lock()
+        self.local = local()
+
+    @contextmanager
+    def scope(self):
+        """Drop the tasks added on this thread in the with block when it exits, finished or not"""
+        added = []
+        scopes = self.local.__dict__.setdefault('scopes', [])
+        scopes.append(added)
+        try:
+            yield self
+        finally:
+            scopes.pop()
+            with self.lock:
+                for task_id in added:
+                    self.tasks.pop(task_id, None)
+
+    def remove_task(self, task_id):
+        with self.lock:
+            self.tasks.pop(task_id, None)
+
+    def add_task(self, description, total=None, completed=0, **kwargs):
+        with self.lock:
+            task_id = self.next_id
+            self.next_id += 1
+            now = time.monotonic()
+            self.tasks[task_id] = {
+                'description': description,
+                'total': total,
+                'completed': completed,
+                'started': now,
+                'logged': now,
+            }
+            scopes = getattr(self.local, 'scopes', None)
+            if scopes:
+                scopes[-1].append(task_id)
+        return task_id
+
+    def update(self, task_id, total=None, completed=None, advance=None, description=None, **kwargs):
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return
+            if total is not None:
+                task['total'] = total
+            if completed is not None:
+                task['completed'] = completed
+            if advance is not None:
+                task['completed'] += advance
+            if description is not None:
+                task['description'] = description
+            now = time.monotonic()
+            message = level = None
+            if task['total'] is not None and task['completed'] >= task['total']:
+                self.tasks.pop(task_id, None)
+                level = 'info' if now - task['started'] >= self.interval else 'debug'
+                message = f'{self.format(task)} done in {now - task["started"]:.1f}s'
+            elif now - task['logged'] >= self.interval:
+                task['logged'] = now
+                level, message = 'info', self.format(task)
+        if message is not None:
+            getattr(log, level)(message)
+
+    @staticmethod
+    def format(task):
+        total = '?' if task['total'] is None else f'{task["total"]:g}'
+        return f'{Text.from_markup(task["description"]).plain} {task["completed"]:g}/{total}'
+
+
 class HUD:
-    def __init__(self, title='Looking at words...'):
+    """
+    Live display of the progress of @hud decorated calls.
+    In headless mode nothing is rendered, progress is logged by a LogProgress instead.
+    The display is only built the first time it is shown.
+    """
+
+    def __init__(self, title='Looking at words...', headless=False, log_interval=5.0):
         self.title = title
         self.refresh_per_second = 4
-        self.progress = Progress(
+        self.headless = headless
+        self.log_progress = LogProgress(log_interval)
+        self._progress = None
+        self._live = None
+        self.depth = 0
+        self.lock = Lock()
+
+    @property
+    def progress(self):
+        if self._progress is None:
+            self._progress = self.make_progress()
+        return self._progress
+
+    @property
+    def live(self):
+        if self._live is None:
+            self._live = Live(
+                self.make_layout(),
+                refresh_per_second=self.refresh_per_second,
+                screen=False,
+            )
+        return self._live
+
+    def tasks(self):
+        """What @hud decorated functions add their tasks to"""
+        return self.log_progress if self.headless else self.progress
+
+    def make_progress(self):
+        return Progress(
             SpinnerColumn('dots', style='blue'),
             MofNCompleteColumn(),
             TaskProgressColumn(),
@@ -37,20 +158,20 @@ class HUD:
             expand=True,
             disable=True,
         )
-        # self.console = Console()
-        self.layout = self.make_layout()
-        self.live = Live(
-            self.layout,
-            refresh_per_second=self.refresh_per_second,
-            screen=False,
-        )
 
     def __enter__(self):
-        self.live.__enter__()
+        # Nested and concurrent calls share the display, started by the first and stopped by the last
+        with self.lock:
+            self.depth += 1
+            if self.depth == 1:
+                self.live.__enter__()
         return self
-    
+
     def __exit__(self, *args):
-        self.live.__exit__(*args)
+        with self.lock:
+            self.depth -= 1
+            if self.depth == 0:
+                self.live.__exit__(*args)
 
     
 
@@ -89,17 +210,28 @@ class HUD:
 
         return layout
 
-    def progress(self):
-        return self.progress
-
 def get_hud():
     return H
 
-H = HUD()
+def set_headless(headless=True, log_interval=None):
+    """
+    Turn headless mode on or off, also on with the LOOKSATWORDS_HEADLESS environment variable
+    :param log_interval: optional, float, minimum seconds between progress lines of a task
+    """
+    H.headless = headless
+    if log_interval is not None:
+        H.log_progress.interval = log_interval
+
+H = HUD(headless=environ.get('LOOKSATWORDS_HEADLESS', '') not in ('', '0'))
 
 def hud(func):
+    """Show the progress of func on the HUD and measure each call of it, see metrics.Metrics"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        with get_hud().live as hud:
-            return func(*args, hud=get_hud().progress, **kwargs)
+        display = get_hud()
+        scope = display.log_progress.scope() if display.headless else display
+        with scope, metrics.measure(func.__qualname__) as call:
+            result = func(*args, hud=display.tasks(), **kwargs)
+            call['rows'] = count_rows(result, args)
+            return result
     return wrapper
\ No newline at end of file
@@ -1,12 +1,25 @@
-import ollama
+from threading import Lock
 
+import httpx
+import ollama
 
+from .cache import DiskCache
+from .concurrency import retry
 
 
 host_url = 'http://localhost:11434'
+model = 'llama3.1'
 publisher = 'Made by Ollama'
+# Seconds to wait for a single response
+timeout = 120
+# Times a failed or timed out request is sent again
+retries = 2
 
-news_bot = ollama.Client(host=host_url)
+# One client, and so one connection pool, shared by every thread asking questions, see client
+news_bot = None
+client_lock = Lock()
+# Responses cache, see use_cache
+cache = None
 headline_bot_init = [
         {
             'role': 'system',
@@ -20,20 +33,60 @@ description_bot_init = [
         },
 ]
 
-def ask(question, context=[{'role':'system', 'content':'You are a helpful knowledge sharer'}]):
-    response = news_bot.chat(model='llama3.1', messages=[
+def use_cache(path='llm_cache.sqlite', max_entries=100_000, mode='readwrite'):
+    """
+    Cache the answers of ask on disk, keyed by model, messages and options.
+    See cache.DiskCache for the modes, 'replay' only answers questions asked before.
+    Pass path=None to stop caching.
+    """
+    global cache
+    cache = None if path is None else DiskCache(path, max_entries=max_entries, mode=mode)
+    return cache
+
+def client():
+    """The shared Ollama client, created on first use"""
+    global news_bot
+    if news_bot is None:
+        with client_lock:
+            if news_bot is None:
+                news_bot = ollama.Client(host=host_url, timeout=timeout)
+    return news_bot
+
+def retryable(error):
+    """Whether a failed request is worth sending again: server and connection errors, not 4xx"""
+    return not isinstance(error, ollama.ResponseError) or error.status_code >= 500
+
+def chat(messages, options=None):
+    response = retry(
+        lambda: client().chat(model=model, messages=messages, options=options),
+        retries=retries,
+        exceptions=(ollama.ResponseError, ConnectionError, httpx.HTTPError),
+        retryable=retryable,
+    )
+    return response['message']['content']
+
+def ask(question, context=[{'role':'system', 'content':'You are a helpful knowledge sharer'}], options=None):
+    """
+    Ask the model a question
+    :param options: optional, dict of Ollama model options, e.g. {'seed': 1}.
+    Identical questions are only answered once by the cache, unless their options differ
+    """
+    messages = [
         *context,
         {
             'role': 'user',
             'content': question,
         },
-        ])
-    
-    return response['message']['content']
+    ]
+    if cache is None:
+        return chat(messages, options)
+    return cache.get_or_set(
+        DiskCache.key(model, messages, options), lambda: chat(messages, options)
+    )
 
-def generate_news_headline(seed: str = ''):
-    return ask('generate a single random {seed} news headline?', headline_bot_init)
+def generate_news_headline(seed: str = '', options=None):
+    return ask('generate a single random {seed} news headline?', headline_bot_init, options)
 
-def generate_news_description(headline:str):
-    return ask(f'generate a single random news story based on the headline "{headline}"?', description_bot_init)
+def generate_news_description(headline:str, options=None):
+    return ask(f'generate a single random news story based on the headline "{headline}"?', description_bot_init, options)
 
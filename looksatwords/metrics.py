@@ -0,0 +1,161 @@
+import atexit
+import cProfile
+import json
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from os import environ, makedirs, path
+from threading import Lock, local
+
+from pandas import DataFrame, Series
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss():
+    """Peak resident set size of this process so far in bytes, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def count_rows(result, args):
+    """Rows processed by a call: the length of a returned DataFrame, else of its object's df"""
+    if isinstance(result, (DataFrame, Series)):
+        return len(result)
+    df = getattr(args[0], 'df', None) if args else None
+    return len(df) if isinstance(df, DataFrame) else None
+
+
+def new_totals():
+    return {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0, 'peak_rss_bytes': None}
+
+
+def add_call(totals, call):
+    """Add a call record to the totals of its stage"""
+    totals['calls'] += 1
+    totals['wall_seconds'] += call['wall_seconds']
+    totals['cpu_seconds'] += call['cpu_seconds']
+    totals['rows'] += call['rows'] or 0
+    if call['peak_rss_bytes'] is not None:
+        totals['peak_rss_bytes'] = max(totals['peak_rss_bytes'] or 0, call['peak_rss_bytes'])
+
+
+def quote(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Metrics:
+    """
+    Measurements of every call of a @hud decorated function: wall and CPU seconds,
+    rows processed and the peak RSS of the process when it returned.
+    CPU seconds are those of the calling thread, work done in worker processes isn't counted.
+    With profile_path set, the outermost call on each thread is also profiled with cProfile,
+    and its stats dumped to profile_path/{stage}-{n}.prof for pstats or snakeviz.
+    Totals per stage are kept as calls return, and only the last max_calls calls,
+    so long running processes don't grow.
+    """
+
+    def __init__(self, profile_path=None, max_calls=1000):
+        """
+        :param max_calls: int, number of the most recent call records kept in self.calls
+        """
+        self.profile_path = profile_path
+        self.max_calls = max_calls
+        self.calls = deque(maxlen=max_calls)
+        self.stages = defaultdict(new_totals)
+        self.count = 0
+        self.lock = Lock()
+        self.local = local()
+
+    @contextmanager
+    def measure(self, stage):
+        """Measure the calls in the with block as one call of stage, yielding its record"""
+        record = {'stage': stage, 'rows': None}
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        profiler = cProfile.Profile() if self.profile_path is not None and depth == 0 else None
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is already active
+                profiler = None
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.thread_time() - cpu_start
+            record['peak_rss_bytes'] = peak_rss()
+            record['depth'] = depth
+            self.local.depth = depth
+            with self.lock:
+                self.calls.append(record)
+                add_call(self.stages[stage], record)
+                self.count += 1
+                n = self.count
+            if profiler is not None:
+                makedirs(self.profile_path, exist_ok=True)
+                profiler.dump_stats(path.join(self.profile_path, f'{stage}-{n}.prof'))
+
+    def reset(self):
+        with self.lock:
+            self.calls = deque(maxlen=self.max_calls)
+            self.stages = defaultdict(new_totals)
+            self.count = 0
+
+    def summary(self):
+        """Totals of the calls of each stage, with rows per wall second where rows are known"""
+        with self.lock:
+            stages = {name: dict(totals) for name, totals in self.stages.items()}
+        for stage in stages.values():
+            stage['rows_per_second'] = stage['rows'] / stage['wall_seconds'] if stage['wall_seconds'] else None
+        return stages
+
+    def to_json(self):
+        with self.lock:
+            calls = list(self.calls)
+        return json.dumps({'stages': self.summary(), 'calls': calls}, indent=2)
+
+    def to_openmetrics(self):
+        """The stage totals in the OpenMetrics text format"""
+        summary = self.summary()
+        families = [
+            ('looksatwords_stage_calls', 'counter', 'Calls of the stage', 'calls'),
+            ('looksatwords_stage_wall_seconds', 'counter', 'Wall seconds spent in the stage', 'wall_seconds'),
+            ('looksatwords_stage_cpu_seconds', 'counter', 'CPU seconds of the calling threads', 'cpu_seconds'),
+            ('looksatwords_stage_rows', 'counter', 'Rows processed by the stage', 'rows'),
+            ('looksatwords_stage_peak_rss_bytes', 'gauge', 'Peak RSS after the stage', 'peak_rss_bytes'),
+        ]
+        lines = []
+        for name, kind, description, key in families:
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'# HELP {name} {description}.')
+            suffix = '_total' if kind == 'counter' else ''
+            for stage, totals in summary.items():
+                if totals[key] is not None:
+                    lines.append(f'{name}{suffix}{{stage="{quote(stage)}"}} {totals[key]}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, file_path):
+        """Write the metrics to file_path, as OpenMetrics text for .prom or .txt files, else as JSON"""
+        text = self.to_openmetrics() if file_path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(file_path, 'w') as f:
+            f.write(text)
+        return file_path
+
+
+# Measures every @hud decorated call. Set LOOKSATWORDS_METRICS to a file path to export the
+# metrics there when the process exits, and LOOKSATWORDS_PROFILE to a directory to profile
+metrics = Metrics(profile_path=environ.get('LOOKSATWORDS_PROFILE'))
+if environ.get('LOOKSATWORDS_METRICS'):
+    atexit.register(metrics.export, environ['LOOKSATWORDS_METRICS'])
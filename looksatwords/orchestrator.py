@@ -1,20 +1,42 @@
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from pandas import concat
+
+from .concurrency import background, thread_map
+from .dedup import Deduplicator
 from .gatherer import GnewsGatherer
-from .generator import GnewsGenerator
-from .analyzer import Analyzer
-from .visualizer import Visualizer
 from .hud import hud
+from .logs import log
+from .rollup import Rollup
+from .scheduler import Scheduler
 
-
+# The generator, analyzer and visualizer import Ollama, NLTK, bokeh and matplotlib,
+# so they are only imported by the stages that use them
+if TYPE_CHECKING:
+    from .generator import GnewsGenerator
+    from .search import SearchIndex
 
 
 class Orchestrator:
 
     def __init__(self,
                  gatherers: list[GnewsGatherer] = [],
-                 generators: list[GnewsGenerator] = []
+                 generators: list['GnewsGenerator'] = [],
+                 deduplicator: Deduplicator = None,
+                 rollup: Rollup = None,
+                 search_index: 'SearchIndex' = None,
                  ):
+        """
+        :param rollup: optional, Rollup updated with the analyzed articles, by analyze and stream.
+        Articles analyzed twice are counted twice, so gather with dedup
+        :param search_index: optional, SearchIndex updated with the analyzed articles, by analyze and stream
+        """
         self.gatherers = gatherers
         self.generators = generators
+        self.deduplicator = deduplicator
+        self.rollup = rollup
+        self.search_index = search_index
         self.visualizer = None
 
     def add_gatherer(self, gatherer: GnewsGatherer):
@@ -23,10 +45,10 @@ class Orchestrator:
     def add_gatherers(self, gatherers: list[GnewsGatherer]):
         self.gatherers.extend(gatherers)
 
-    def add_generator(self, generator: GnewsGenerator):
+    def add_generator(self, generator: 'GnewsGenerator'):
         self.generators.append(generator)
 
-    def add_generators(self, generators: list[GnewsGenerator]):
+    def add_generators(self, generators: list['GnewsGenerator']):
         self.generators.extend(generators)
 
     @hud
@@ -38,18 +60,50 @@ class Orchestrator:
             time.sleep(0.1)
 
     @hud
-    def gather(self, hud, num_articles=3):
-        for gatherer in self.gatherers:
-            task_gather = hud.add_task(f"[cyan]Orchestrator:Gathering {gatherer.query} articles...", total=1)
-            gatherer.gather()
+    def gather(self, hud, num_articles=3, max_workers=8):
+        """
+        Run all gatherers at once, each gathering all of its query facets at once
+        :param max_workers: int, maximum number of gatherers running at once
+        """
+        tasks = [
+            hud.add_task(f"[cyan]Orchestrator:Gathering {gatherer.query} articles...", total=1)
+            for gatherer in self.gatherers
+        ]
+        for task_gather, _ in zip(
+            tasks, thread_map(lambda gatherer: gatherer.gather(), self.gatherers, max_workers=max_workers)
+        ):
             hud.update(task_gather, advance=1)
 
     @hud
-    def save(self, hud):
+    def dedup(self, hud):
+        """
+        Drop the articles of each gatherer that were already gathered,
+        by an earlier gatherer or in an earlier run
+        """
+        if self.deduplicator is None:
+            self.deduplicator = Deduplicator()
+        for gatherer in self.gatherers:
+            task_dedup = hud.add_task(f"[cyan]Orchestrator:Deduplicating {gatherer.query} articles...", total=1)
+            self.deduplicator.attach(gatherer)
+            gatherer.df = self.deduplicator.dedup(gatherer.df)
+            hud.update(task_dedup, advance=1)
+        log.info(f'Dedup: {self.deduplicator.stats}')
+        return self.deduplicator.stats
+
+    @hud
+    def save(self, hud, generated=False):
+        """
+        :param generated: bool, also save the articles of the generators
+        """
         for gatherer in self.gatherers:
             task_save = hud.add_task(f"[cyan]Orchestrator:Saving {gatherer.query} articles...", total=1)
             gatherer.save()
             hud.update(task_save, advance=1)
+        if generated:
+            for generator in self.generators:
+                task_save = hud.add_task(f"[cyan]Orchestrator:Saving {generator.table_name} articles...", total=1)
+                generator.save()
+                hud.update(task_save, advance=1)
 
     @hud
     def validate(self, hud):
@@ -66,15 +120,136 @@ class Orchestrator:
             hud.update(task_generate, advance=1)
 
     @hud
-    def analyze(self, hud):
-        self.analyzer = Analyzer(dfs=[gatherer.df for gatherer in self.gatherers])
-        self.analyzer.gather()
+    def analyze(self, hud, incremental=False, workers=1, generated=False):
+        """
+        :param generated: bool, also analyze the articles of the generators
+        :param incremental: bool, only analyze articles that aren't in the analyzer table yet,
+        load the others from it
+        :param workers: int, number of processes to analyze with, see Analyzer
+        """
+        from .analyzer import Analyzer
+
+        sources = self.gatherers + self.generators if generated else self.gatherers
+        self.analyzer = Analyzer(dfs=[source.df for source in sources], workers=workers)
+        if self.rollup is not None:
+            self.rollup.attach(self.analyzer)
+        if self.search_index is not None:
+            self.search_index.attach(self.analyzer)
+        # Only gather top articles when there are no gathered or generated ones to analyze
+        if self.analyzer.df.empty:
+            self.analyzer.gather()
         self.analyzer.build_words_df()
-        self.analyzer.preprocess()
-        self.analyzer.analyze()
+        try:
+            if incremental:
+                self.analyzer.analyze_incremental()
+            else:
+                self.analyzer.preprocess()
+                self.analyzer.analyze()
+                # The analyzer doesn't save here, so its save hooks don't run
+                if self.rollup is not None:
+                    self.rollup.update(self.analyzer.df)
+                if self.search_index is not None:
+                    self.search_index.add(self.analyzer.df)
+        finally:
+            self.analyzer.close()
+
+    def iter_chunks(self, chunk_size=1000):
+        """Yield (gatherer, articles) for chunks of at most chunk_size articles as they are gathered"""
+        for gatherer in self.gatherers:
+            for df in gatherer.iter_gather():
+                for start in range(0, len(df), chunk_size):
+                    yield gatherer, df.iloc[start : start + chunk_size].reset_index(drop=True)
+
+    @hud
+    def stream(self, hud, chunk_size=1000, max_queued=4, analyzer=None):
+        """
+        Gather, dedup, save and analyze articles in chunks of at most chunk_size articles,
+        so memory use depends on chunk_size instead of the number of articles.
+        Gathering runs on a background thread, at most max_queued chunks ahead of analysis.
+        Analyzed chunks are saved to the analyzer table, and word counts are kept
+        in self.word_counts instead of a words DataFrame.
+        :param analyzer: optional, Analyzer to analyze and save the chunks with
+        """
+        from .analyzer import Analyzer
+
+        if self.deduplicator is None:
+            self.deduplicator = Deduplicator()
+        self.analyzer = analyzer if analyzer is not None else Analyzer()
+        if self.rollup is not None:
+            self.rollup.attach(self.analyzer)
+        if self.search_index is not None:
+            self.search_index.attach(self.analyzer)
+        self.word_counts = Counter()
+        stats = {'chunks': 0, 'gathered': 0, 'analyzed': 0}
+        task = hud.add_task("[cyan]Orchestrator:Streaming articles...", total=None)
+        try:
+            for gatherer, chunk in background(self.iter_chunks(chunk_size), maxsize=max_queued):
+                stats['chunks'] += 1
+                stats['gathered'] += len(chunk)
+                chunk = self.deduplicator.dedup(chunk)
+                if chunk.empty:
+                    continue
+                self.deduplicator.attach(gatherer)
+                gatherer.df = chunk
+                gatherer.save()
+                gatherer.df = chunk.iloc[:0]
+                self.word_counts.update(
+                    word.lower()
+                    for text in concat([chunk['headline'], chunk['description']])
+                    for word in text.split()
+                )
+                self.analyzer.df = chunk.reset_index(drop=True)
+                self.analyzer.documents = None
+                self.analyzer.preprocess()
+                self.analyzer.analyze()
+                self.analyzer.save()
+                stats['analyzed'] += len(chunk)
+                hud.update(task, advance=len(chunk))
+        finally:
+            self.analyzer.close()
+        log.info(f'Stream: {stats}, dedup: {self.deduplicator.stats}')
+        return stats
+
+    def run(self, dedup=True, analyze=True, visualize=True, incremental=False, workers=1):
+        """
+        Run the pipeline as a DAG of stages, running independent stages at the same time:
+        gathering and generating run together, and the generated articles are saved
+        and analyzed with the gathered ones. Analysis runs after saving, as both write
+        to the same database, and so do the save hooks of the rollup and search index.
+        Stages run on threads, analysis spreads its work over workers processes.
+        Logs the wall time of each stage and the critical path.
+        :return: Scheduler, with the timings of the run
+        """
+        scheduler = Scheduler()
+        scheduler.add('gather', self.gather)
+        if self.generators:
+            scheduler.add('generate', self.generate)
+        gathered = 'gather'
+        if dedup:
+            scheduler.add('dedup', self.dedup, deps=['gather'])
+            gathered = 'dedup'
+        generated = bool(self.generators)
+        scheduler.add(
+            'save',
+            lambda: self.save(generated=generated),
+            deps=[gathered, 'generate'] if generated else [gathered],
+        )
+        if analyze:
+            scheduler.add(
+                'analyze',
+                lambda: self.analyze(incremental=incremental, workers=workers, generated=generated),
+                deps=['save'],
+            )
+            if visualize:
+                scheduler.add('visualize', self.visualize, deps=['analyze'])
+        scheduler.run()
+        log.info(f'Stages:\n{scheduler.report()}')
+        return scheduler
 
     @hud
     def visualize(self, hud):
+        from .visualizer import Visualizer
+
         self.visualizer = Visualizer()
         self.visualizer.df = self.analyzer.df
         self.visualizer.make_plots()
\ No newline at end of file
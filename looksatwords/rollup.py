@@ -0,0 +1,119 @@
+import numpy as np
+from pandas import DataFrame, Series, concat, to_datetime
+
+from .dataio import DataIO, published_dates, publisher_titles
+from .hud import hud
+from .validator import pos_suffixes, sentiment_suffixes, wordcount_suffix
+
+keys = ['bucket', 'publisher', 'query']
+# Per article metrics of analyzed rows, as the analyzer names them
+rollup_metrics = [
+    f'{column}_{suffix}'
+    for column in ['headline', 'description']
+    for suffix in [suffix for suffix in sentiment_suffixes if suffix != 'sentiment'] + wordcount_suffix + pos_suffixes
+]
+
+
+class Rollup(DataIO):
+    """
+    Aggregates of analyzed articles per hour, publisher and query: the number of articles,
+    and the sum and sum of squares of each metric, from which the mean and standard deviation
+    of any coarser group follow without going back to the articles.
+    Updated incrementally with update, or by attaching it to the DataIO that saves analyzed rows.
+    The aggregates are persisted in their own table and kept in memory in self.aggregates.
+    """
+
+    def __init__(self, db_path='data.json', table_name='rollup', metrics=rollup_metrics, **kwargs):
+        """
+        :param metrics: list of numeric columns to aggregate, missing ones are skipped
+        """
+        super().__init__(db_path=db_path, table_name=table_name, **kwargs)
+        self.metrics = list(metrics)
+        self.aggregates = compact(self.load())
+        self.df = DataFrame()
+
+    def attach(self, dataio):
+        """Update the aggregates with the rows dataio saves from now on"""
+        dataio.add_save_hook(self.update)
+        return self
+
+    def aggregate(self, df):
+        """Aggregates of the rows of df, articles without a parsable published date are skipped"""
+        buckets = published_dates(df).dt.strftime('%Y-%m-%dT%H:00')
+        metrics = [metric for metric in self.metrics if metric in df.columns]
+        values = df[metrics].apply(lambda column: column.astype(float))
+        rows = concat(
+            [
+                DataFrame(
+                    {
+                        'bucket': buckets,
+                        'publisher': publisher_titles(df) if 'publisher' in df.columns else '',
+                        'query': df['query'].astype(str) if 'query' in df.columns else '',
+                        'count': 1,
+                    },
+                    index=df.index,
+                ),
+                values.add_suffix('_sum'),
+                (values**2).add_suffix('_sumsq'),
+            ],
+            axis=1,
+        )
+        return compact(rows.dropna(subset=['bucket']))
+
+    @hud
+    def update(self, df, hud):
+        """Add the rows of df to the aggregates, and save their aggregates"""
+        if df.empty:
+            return self.aggregates
+        task = hud.add_task("[blue]Rollup:Aggregating articles...", total=1)
+        self.df = self.aggregate(df)
+        self.save()
+        self.aggregates = compact(concat([self.aggregates, self.df], ignore_index=True))
+        hud.update(task, advance=1)
+        return self.aggregates
+
+    def query(self, freq='D', by=('publisher',), start=None, end=None, metrics=None, **filters):
+        """
+        Number of articles, and mean and standard deviation of each metric,
+        per time bucket and per value of the columns in by
+        :param freq: optional, str, pandas period frequency of the time buckets, e.g. 'h', 'D',
+        'W' or 'M', None for no time buckets
+        :param by: columns to group by besides time, among 'publisher' and 'query'
+        :param start: optional, str or datetime, first time included
+        :param end: optional, str or datetime, first time excluded
+        :param metrics: optional, list of metrics, all aggregated metrics if None
+        :param filters: column=value or column=[values] to only include, e.g. publisher='BBC'
+        :return: DataFrame indexed by the time bucket ('time') and the by columns
+        """
+        df = self.aggregates
+        times = to_datetime(df['bucket'], utc=True)
+        keep = np.ones(len(df), dtype=bool)
+        if start is not None:
+            keep &= times >= to_datetime(start, utc=True)
+        if end is not None:
+            keep &= times < to_datetime(end, utc=True)
+        for column, value in filters.items():
+            keep &= df[column].isin(value if isinstance(value, (list, tuple, set)) else [value])
+        df, times = df[keep], times[keep]
+        if metrics is None:
+            metrics = [column[: -len('_sum')] for column in df.columns if column.endswith('_sum')]
+
+        groups = list(by)
+        if freq is not None:
+            df = df.assign(time=times.dt.tz_localize(None).dt.to_period(freq).dt.start_time)
+            groups = ['time'] + groups
+        sums = [f'{metric}_{total}' for metric in metrics for total in ['sum', 'sumsq']]
+        totals = df.groupby(groups)[['count'] + sums].sum() if groups else df[['count'] + sums].sum().to_frame().T
+        result = totals[['count']].copy()
+        for metric in metrics:
+            mean = totals[f'{metric}_sum'] / totals['count']
+            result[f'{metric}_mean'] = mean
+            result[f'{metric}_std'] = np.sqrt((totals[f'{metric}_sumsq'] / totals['count'] - mean**2).clip(lower=0))
+        return result
+
+
+def compact(df):
+    """Sum the aggregates of df that share a bucket, publisher and query"""
+    if df.empty:
+        return DataFrame({**{key: Series(dtype=object) for key in keys}, 'count': Series(dtype='int64')})
+    return df.groupby(keys, as_index=False).sum()
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def timed(func):
+    """Call func, returning its result with the wall clock times it started and ended"""
+    start = time.time()
+    result = func()
+    return result, start, time.time()
+
+
+class Stage:
+    """
+    A step of a pipeline, run on a thread once all of the stages it depends on are done.
+    CPU bound stages spread their own work over processes, like Analyzer.
+    :param func: callable taking no arguments
+    :param deps: names of the stages to run first
+    """
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+
+class Scheduler:
+    """
+    Runs a DAG of stages, each as soon as its dependencies are done,
+    so independent stages run at the same time.
+    After run, self.timings holds the start, end and wall seconds of each stage.
+    """
+
+    def __init__(self, max_threads=8):
+        self.stages = {}
+        self.max_threads = max_threads
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        self.stages[name] = Stage(name, func, deps)
+        return self
+
+    def order(self):
+        """Stage names in an order where each stage comes after its dependencies"""
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}' required by '{path[-1]}'")
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            if state.get(name) == 'done':
+                return
+            state[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def run(self):
+        """Run all stages, returning a dict of their results by name"""
+        self.order()
+        self.results = {}
+        self.timings = {}
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_threads) as threads:
+            try:
+                while pending or running:
+                    for name, stage in list(pending.items()):
+                        if all(dep in self.results for dep in stage.deps):
+                            future = threads.submit(timed, stage.func)
+                            running[future] = name
+                            del pending[name]
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        result, start, end = future.result()
+                        self.results[name] = result
+                        self.timings[name] = {'start': start, 'end': end, 'wall': end - start}
+            finally:
+                for future in running:
+                    future.cancel()
+        return self.results
+
+    def critical_path(self):
+        """
+        The chain of dependent stages with the longest total wall time,
+        which bounds the wall time of the whole run
+        :return: (list of stage names, total wall seconds)
+        """
+        longest = {}
+        for name in self.order():
+            deps = [dep for dep in self.stages[name].deps if dep in longest]
+            before = max((longest[dep] for dep in deps), key=lambda path: path[1], default=([], 0.0))
+            longest[name] = (before[0] + [name], before[1] + self.timings.get(name, {}).get('wall', 0.0))
+        return max(longest.values(), key=lambda path: path[1], default=([], 0.0))
+
+    def report(self):
+        """Text report of the wall time of each stage, the whole run and the critical path"""
+        if not self.timings:
+            return 'No stages run'
+        start = min(timing['start'] for timing in self.timings.values())
+        end = max(timing['end'] for timing in self.timings.values())
+        lines = [
+            f'{name}: {timing["wall"]:.2f}s (from {timing["start"] - start:.2f}s)'
+            for name, timing in sorted(self.timings.items(), key=lambda item: item[1]['start'])
+        ]
+        path, wall = self.critical_path()
+        lines.append(f'total: {end - start:.2f}s, sum of stages: {sum(t["wall"] for t in self.timings.values()):.2f}s')
+        lines.append(f'critical path: {" -> ".join(path)} ({wall:.2f}s)')
+        return '\n'.join(lines)
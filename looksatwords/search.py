@@ -0,0 +1,176 @@
+import re
+import sqlite3
+from os.path import splitext
+from threading import Lock
+
+from .analyzer import preprocess_texts, preprocess_text
+from .dataio import article_ids
+from .hud import hud
+
+# Quoted phrases or single words of a query
+query_pattern = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+class SearchIndex:
+    """
+    Inverted index of the lemmas of stored articles in an SQLite file: for each lemma,
+    the articles and fields it occurs in and its positions there.
+    Lemmas are those of preprocess_text, the abstracted_{field} columns of analyzed rows,
+    so searches match inflected forms and ignore stopwords.
+    Updated incrementally with add, or by attaching it to the DataIO that saves articles.
+    """
+
+    def __init__(self, path=None, fields=('headline', 'description'), db_path='data.json'):
+        """
+        :param path: optional, str, path of the SQLite file, next to db_path if None, e.g. data.search.sqlite
+        :param fields: columns of the articles to index
+        """
+        if path is None:
+            path = splitext(db_path)[0] + '.search.sqlite'
+        self.path = path
+        self.fields = list(fields)
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS articles (article_id TEXT PRIMARY KEY)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS postings '
+                '(term TEXT, article_id TEXT, field TEXT, positions TEXT, '
+                'PRIMARY KEY (term, article_id, field)) WITHOUT ROWID'
+            )
+
+    def attach(self, dataio):
+        """Index the rows dataio saves from now on"""
+        dataio.add_save_hook(self.add)
+        return self
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    @hud
+    def add(self, df, hud):
+        """
+        Index the articles of df that aren't indexed yet, by their article_id column or article_ids.
+        Uses the abstracted_{field} columns of analyzed rows, or preprocesses the fields
+        """
+        if df.empty:
+            return 0
+        task = hud.add_task("[blue]Search:Indexing articles...", total=len(self.fields) + 1)
+        ids = df['article_id'] if 'article_id' in df.columns else article_ids(df)
+        indexed = set()
+        with self.lock:
+            # In batches below SQLite's limit of query parameters
+            for start in range(0, len(ids), 900):
+                batch = list(ids.iloc[start : start + 900])
+                indexed.update(
+                    row[0]
+                    for row in self.connection.execute(
+                        f'SELECT article_id FROM articles WHERE article_id IN ({",".join("?" * len(batch))})',
+                        batch,
+                    )
+                )
+        new = ~ids.isin(indexed) & ~ids.duplicated()
+        df, ids = df[new], ids[new]
+        hud.update(task, advance=1)
+        postings = []
+        for field in self.fields:
+            if field not in df.columns:
+                hud.update(task, advance=1)
+                continue
+            texts = df[f'abstracted_{field}'] if f'abstracted_{field}' in df.columns else preprocess_texts(df[field])
+            for article_id, text in zip(ids, texts.fillna('')):
+                positions = {}
+                for position, term in enumerate(text.lower().split()):
+                    positions.setdefault(term, []).append(str(position))
+                postings.extend(
+                    (term, article_id, field, ' '.join(term_positions))
+                    for term, term_positions in positions.items()
+                )
+            hud.update(task, advance=1)
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR IGNORE INTO articles VALUES (?)', [(i,) for i in ids])
+            self.connection.executemany('INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?)', postings)
+        return len(ids)
+
+    def select(self, columns, term, fields=None):
+        query = f'SELECT {columns} FROM postings WHERE term = ?'
+        params = [term]
+        if fields is not None:
+            query += f' AND field IN ({",".join("?" * len(fields))})'
+            params += list(fields)
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def postings(self, term, fields=None):
+        """{(article_id, field): [positions]} of a lemma"""
+        return {
+            (article_id, field): [int(p) for p in positions.split()]
+            for article_id, field, positions in self.select('article_id, field, positions', term, fields)
+        }
+
+    def phrase(self, terms, fields=None):
+        """Ids of the articles with the terms at consecutive positions of one field, None without terms"""
+        if not terms:
+            return None
+        if len(terms) == 1:
+            return {row[0] for row in self.select('DISTINCT article_id', terms[0], fields)}
+        matches = {key: set(positions) for key, positions in self.postings(terms[0], fields).items()}
+        for offset, term in enumerate(terms[1:], 1):
+            postings = self.postings(term, fields)
+            matches = {
+                key: starts
+                for key, starts in (
+                    (key, {start for start in starts if start + offset in postings[key]})
+                    for key, starts in matches.items()
+                    if key in postings
+                )
+                if starts
+            }
+        return {article_id for article_id, _ in matches}
+
+    def all_ids(self):
+        with self.lock:
+            return {row[0] for row in self.connection.execute('SELECT article_id FROM articles')}
+
+    def search(self, query, fields=None):
+        """
+        Ids of the articles matching query, where
+        - words must all occur: fox jumps
+        - OR between words or phrases means either: fox OR dog
+        - a leading - excludes: fox -dog
+        - quotes match a phrase: "lazy dog"
+        Words are lemmatized and stopwords ignored, like the indexed text.
+        :param fields: optional, list of fields to search, all indexed fields if None
+        :return: set of article ids
+        """
+        required, excluded = [], []
+        alternatives = None
+        tokens = [match.groups() for match in query_pattern.finditer(query)]
+        for i, (negated, phrase, word) in enumerate(tokens):
+            if word == 'OR':
+                continue
+            if word is not None and word.startswith('-') and len(word) > 1:
+                negated, word = '-', word[1:]
+            ids = self.phrase(preprocess_text(phrase if word is None else word).split(), fields)
+            if ids is None:
+                continue
+            if negated:
+                excluded.append(ids)
+            elif alternatives is not None and i > 0 and tokens[i - 1][2] == 'OR':
+                alternatives |= ids
+            else:
+                alternatives = ids
+                required.append(alternatives)
+        if required:
+            result = set.intersection(*required)
+        else:
+            result = self.all_ids() if excluded else set()
+        for ids in excluded:
+            result -= ids
+        return result
+
+    def filter(self, df, query, fields=None):
+        """The rows of df matching query, see search"""
+        ids = df['article_id'] if 'article_id' in df.columns else article_ids(df)
+        return df[ids.isin(self.search(query, fields))]
@@ -0,0 +1,242 @@
+import json
+import sqlite3
+import time
+from glob import glob
+from os import makedirs, path
+
+from pandas import DataFrame, concat, read_sql_query
+from tinydb import Query, TinyDB
+
+# Most values bound to one SQLite query, below its limit on query parameters
+max_parameters = 900
+
+
+class Storage:
+    """
+    Base class for DataIO storage backends.
+    A backend stores any number of named tables of rows.
+    """
+
+    def load(self, table, columns=None, where=None):
+        """
+        Load a table as a DataFrame
+        :param columns: optional, list of column names to load, all columns if None
+        :param where: optional, (column, values) to only load the rows whose column is in values
+        """
+        raise NotImplementedError
+
+    def append(self, table, df):
+        """Append the rows of df to a table, creating it if needed"""
+        raise NotImplementedError
+
+
+class TinyDBStorage(Storage):
+    """Stores every table in one TinyDB JSON file"""
+
+    def __init__(self, db_path='data.json'):
+        with open(db_path, 'a') as f:
+            pass
+        self.db = TinyDB(db_path)
+
+    def load(self, table, columns=None, where=None):
+        if where is None:
+            rows = self.db.table(table).all()
+        else:
+            column, values = where
+            rows = self.db.table(table).search(Query()[column].one_of(list(values)))
+        df = DataFrame(rows)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+
+    def append(self, table, df):
+        # A single insert_multiple reads and writes the db file once, instead of once per row
+        self.db.table(table).insert_multiple(df.to_dict('records'))
+
+
+class ParquetStorage(Storage):
+    """
+    Stores each table as a directory of Parquet files, one file per append.
+    Loads read only the requested columns. Requires pyarrow.
+    """
+
+    def __init__(self, root='data.parquet'):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError(
+                'ParquetStorage requires pyarrow, install it with `pip install looksatwords[parquet]`'
+            ) from e
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.root = root
+        self.parts = 0
+
+    def files(self, table):
+        return sorted(glob(path.join(self.root, table, '*.parquet')))
+
+    def load(self, table, columns=None, where=None):
+        parts = []
+        for file in self.files(table):
+            schema = self.pq.read_schema(file)
+            names = schema.names if columns is None else [c for c in columns if c in schema.names]
+            filters = None
+            if where is not None:
+                if where[0] not in schema.names:
+                    continue
+                filters = [(where[0], 'in', list(where[1]))]
+            df = self.pq.read_table(file, columns=names, filters=filters).to_pandas()
+            metadata = schema.metadata or {}
+            parts.append(decode_json_columns(df, json.loads(metadata.get(b'json_columns', b'[]'))))
+        if not parts:
+            return DataFrame(columns=columns)
+        return concat(parts, ignore_index=True)
+
+    def append(self, table, df):
+        if df.empty:
+            return
+        makedirs(path.join(self.root, table), exist_ok=True)
+        df, json_columns = encode_json_columns(df)
+        data = self.pa.Table.from_pandas(df, preserve_index=False)
+        data = data.replace_schema_metadata(
+            {**(data.schema.metadata or {}), b'json_columns': json.dumps(json_columns).encode()}
+        )
+        self.parts += 1
+        filename = f'{time.time_ns()}-{self.parts}.parquet'
+        self.pq.write_table(data, path.join(self.root, table, filename))
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores each table as a table of an SQLite database file.
+    Which columns hold JSON encoded values is kept in a table of its own, json_columns_table.
+    """
+
+    # Prefixed so it can't collide with the tables of a DataIO
+    json_columns_table = '_looksatwords_json_columns'
+
+    def __init__(self, db_path='data.sqlite'):
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {quote(self.json_columns_table)} '
+            '(name TEXT, column TEXT, PRIMARY KEY (name, column))'
+        )
+
+    def columns(self, table):
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info({quote(table)})')]
+
+    def load(self, table, columns=None, where=None):
+        names = self.columns(table)
+        if not names or (where is not None and where[0] not in names):
+            return DataFrame(columns=columns)
+        if columns is not None:
+            names = [column for column in columns if column in names]
+        query = f'SELECT {", ".join(map(quote, names))} FROM {quote(table)}'
+        if where is None:
+            df = read_sql_query(query, self.connection)
+        else:
+            column, values = where
+            values = list(values)
+            df = concat(
+                [
+                    read_sql_query(
+                        f'{query} WHERE {quote(column)} IN ({", ".join("?" * len(batch))})',
+                        self.connection,
+                        params=batch,
+                    )
+                    for batch in (
+                        values[start : start + max_parameters] for start in range(0, len(values), max_parameters)
+                    )
+                ]
+                or [DataFrame(columns=names)],
+                ignore_index=True,
+            )
+        return decode_json_columns(df, self.json_columns(table))
+
+    def json_columns(self, table):
+        return [
+            row[0]
+            for row in self.connection.execute(
+                f'SELECT column FROM {quote(self.json_columns_table)} WHERE name = ?', (table,)
+            )
+        ]
+
+    def append(self, table, df):
+        if df.empty:
+            return
+        df, json_columns = encode_json_columns(df, self.json_columns(table))
+        with self.connection:
+            existing = self.columns(table)
+            if not existing:
+                self.connection.execute(
+                    f'CREATE TABLE {quote(table)} ({", ".join(map(quote, df.columns))})'
+                )
+            for column in df.columns:
+                if existing and column not in existing:
+                    self.connection.execute(
+                        f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)}'
+                    )
+            self.connection.executemany(
+                f'INSERT OR IGNORE INTO {quote(self.json_columns_table)} VALUES (?, ?)',
+                [(table, column) for column in json_columns],
+            )
+            rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            self.connection.executemany(
+                f'INSERT INTO {quote(table)} ({", ".join(map(quote, df.columns))}) '
+                f'VALUES ({", ".join("?" * len(df.columns))})',
+                rows,
+            )
+
+
+backends = {
+    'tinydb': (TinyDBStorage, '.json'),
+    'parquet': (ParquetStorage, '.parquet'),
+    'sqlite': (SQLiteStorage, '.sqlite'),
+}
+
+
+def get_storage(backend='tinydb', db_path='data.json'):
+    """
+    Get a storage backend
+    :param backend: Storage instance, or name of a backend:
+    - tinydb: TinyDB JSON file at db_path
+    - parquet: directory of Parquet files next to db_path, e.g. data.parquet/
+    - sqlite: SQLite database next to db_path, e.g. data.sqlite
+    """
+    if isinstance(backend, Storage):
+        return backend
+    if backend not in backends:
+        raise ValueError(f"Invalid backend '{backend}'. Valid backends are: {', '.join(backends)}")
+    cls, extension = backends[backend]
+    return cls(path.splitext(db_path)[0] + extension)
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def encode_json_columns(df, json_columns=()):
+    """
+    JSON encode columns holding dicts or lists, which columnar stores can't hold as is
+    :param json_columns: columns to encode regardless of their values
+    """
+    json_columns = [
+        column
+        for column in df.columns
+        if column in json_columns
+        or df[column].dtype == object
+        and df[column].map(lambda value: isinstance(value, (dict, list))).any()
+    ]
+    if json_columns:
+        df = df.copy()
+        for column in json_columns:
+            df[column] = df[column].map(json.dumps)
+    return df, json_columns
+
+
+def decode_json_columns(df, json_columns):
+    for column in json_columns:
+        if column in df.columns:
+            df[column] = df[column].map(json.loads, na_action='ignore')
+    return df
@@ -0,0 +1,46 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlparse
+
+import gnews.gnews
+import pytest
+
+
+class StubGnewsHandler(BaseHTTPRequestHandler):
+    """Serves one RSS item per search, titled with the search query"""
+    lock = Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        cls = StubGnewsHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.2)
+        q = parse_qs(urlparse(self.path).query)['q'][0]
+        body = f'''<?xml version="1.0"?><rss version="2.0"><channel><item>
+            <title>{q}</title><link>http://example.com/{q}</link>
+            <description>about {q}</description><pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate>
+            <source url="http://example.com">Example</source>
+            </item></channel></rss>'''.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.end_headers()
+        self.wfile.write(body)
+        with cls.lock:
+            cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_gnews(monkeypatch):
+    StubGnewsHandler.max_in_flight = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGnewsHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(gnews.gnews, 'BASE_URL', f'http://127.0.0.1:{server.server_port}/rss')
+    yield StubGnewsHandler
+    server.shutdown()
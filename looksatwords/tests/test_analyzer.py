@@ -1,5 +1,20 @@
-from looksatwords.analyzer import Analyzer
-from looksatwords.gatherer import GnewsGatherer
+from pandas import DataFrame, Series
+
+from looksatwords.analyzer import (
+    Analyzer,
+    apply_sentiment_analysis,
+    cache_stats,
+    clean_text,
+    clean_texts,
+    get_sentiment_scores,
+    load_caches,
+    pos_groups,
+    preprocess_text,
+    process_text,
+    save_caches,
+    tag_cache,
+)
+from looksatwords.gatherer import GnewsGatherer, GnewsQuery
 
 def test_analyzer():
     gath = GnewsGatherer()
@@ -10,4 +25,141 @@ def test_analyzer():
     a.analyze()
 
     assert a.df is not None
-    assert a.words_df is not None
\ No newline at end of file
+    assert a.words_df is not None
+
+def test_process_text():
+    text = 'The quick brown fox jumps over the lazy dog.'
+    document = process_text(text)
+    assert document['cleaned'] == preprocess_text(text)
+    assert document['wordcount'] == len(document['cleaned'].split())
+
+def test_process_text_grammar():
+    text = 'The big dogs bark loudly in a park'
+    # Pin the tags, so the counts don't depend on the tagger model
+    tag_cache.set(text, [
+        ('the', 'DT'), ('big', 'JJ'), ('dogs', 'NNS'), ('bark', 'VBP'),
+        ('loudly', 'RB'), ('in', 'IN'), ('a', 'DT'), ('park', 'NN'),
+    ])
+    document = process_text(text)
+    assert document['cleaned'] == 'big dog bark loudly park'
+    assert document['wordcount'] == 5
+    # Stopwords are dropped before counting, so the preposition 'in' isn't counted
+    assert {group.lower(): document[group.lower()] for group in pos_groups} == {
+        'noun': 2, 'verb': 1, 'adjective': 1, 'adverb': 1,
+        'pronoun': 0, 'conjunction': 0, 'preposition': 0, 'interjection': 0,
+    }
+
+def test_analyzer_parallel(stub_gnews):
+    gath = GnewsGatherer(q=GnewsQuery(keyword='quick foxes', topic='lazy dogs'))
+    gath.gather()
+    serial = Analyzer(dfs=[gath.df.copy()])
+    serial.preprocess()
+    serial.analyze()
+    parallel = Analyzer(dfs=[gath.df.copy()], workers=2, chunksize=1)
+    parallel.preprocess()
+    executor = parallel.executor
+    parallel.analyze()
+    assert parallel.executor is executor
+    parallel.close()
+    assert parallel.executor is None
+
+    assert parallel.df.equals(serial.df)
+
+def test_analyzer_incremental(stub_gnews, tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    gath = GnewsGatherer(q=GnewsQuery(keyword='quick foxes', topic='lazy dogs'))
+    gath.gather()
+    first = Analyzer(db_path=db_path, dfs=[gath.df.copy()])
+    first.analyze_incremental()
+    stored = len(first.load())
+
+    second = Analyzer(db_path=db_path, dfs=[gath.df.copy()])
+    df = second.analyze_incremental()
+    assert len(second.load()) == stored
+    assert len(df) == stored
+
+    third = Analyzer(db_path=db_path, dfs=[gath.df.iloc[:1].copy()])
+    assert third.analyze_incremental()['headline'].tolist() == df['headline'].tolist()[:1]
+    assert len(third.load()) == stored
+
+def test_apply_sentiment_analysis():
+    df = DataFrame({'text': ['good news', 'bad news', 'good news']})
+    apply_sentiment_analysis(df, 'text', 'text', keep_sentiment=False)
+    assert 'text_sentiment' not in df.columns
+    assert df['text_compound'].dtype == 'float64'
+    assert df['text_compound'].tolist()[0] == df['text_compound'].tolist()[2]
+    assert df['text_compound'].tolist()[1] == get_sentiment_scores('bad news')['compound']
+
+def test_apply_sentiment_analysis_chunksize(monkeypatch):
+    import looksatwords.analyzer
+
+    chunksizes = []
+    map_texts = looksatwords.analyzer.map_texts
+
+    def recording_map_texts(func, texts, **kwargs):
+        chunksizes.append(kwargs['chunksize'])
+        return map_texts(func, texts, **kwargs)
+
+    monkeypatch.setattr(looksatwords.analyzer, 'map_texts', recording_map_texts)
+    apply_sentiment_analysis(DataFrame({'text': ['good news']}), 'text', 'text', chunksize=7)
+    assert chunksizes == [7]
+
+def test_analyzer_caches(tmp_path):
+    text = 'The quick brown fox jumps over the lazy dog.'
+    process_text(text)
+    hits = cache_stats()['tag']['hits']
+    process_text(text)
+    assert cache_stats()['tag']['hits'] == hits + 1
+
+    save_caches(str(tmp_path))
+    tag_cache.data.clear()
+    load_caches(str(tmp_path))
+    assert process_text(text)['cleaned'] == preprocess_text(text)
+
+def tracked_values():
+    import looksatwords.analyzer
+
+    return [cache.added for cache in looksatwords.analyzer.caches.values()]
+
+def test_analyzer_parallel_caches(tmp_path):
+    import json
+
+    cache_path = str(tmp_path / 'caches')
+    headlines = ['Parallel zebras graze quietly', 'Parallel otters swim happily']
+    analyzer = Analyzer(
+        db_path=str(tmp_path / 'data.json'),
+        dfs=[DataFrame({'headline': headlines, 'description': ['Striped zebras', 'Wet otters']})],
+        workers=2,
+        chunksize=1,
+        cache_path=cache_path,
+    )
+    analyzer.analyze()
+    analyzer.close()
+    with open(f'{cache_path}/sentiment.json') as f:
+        sentiments = {key for key, _ in json.load(f)}
+    assert set(analyzer.df['headline_cleaned']) <= sentiments
+
+    untracked = Analyzer(db_path=str(tmp_path / 'data.json'), workers=2, chunksize=1)
+    untracked.df = DataFrame({'headline': ['Counted zebras'] * 4, 'description': ['Counted otters'] * 4})
+    misses = cache_stats()['sentiment']['misses']
+    untracked.analyze()
+    assert untracked.pool().submit(tracked_values).result() == [None, None, None]
+    untracked.close()
+    assert cache_stats()['sentiment']['misses'] > misses
+
+def test_build_words_df(tmp_path):
+    a = Analyzer(db_path=str(tmp_path / 'data.json'))
+    a.df = DataFrame({'headline': ['The Fox', 'the dog'], 'description': ['A fox jumps', 'THE END']})
+    a.build_words_df()
+
+    assert a.words_df['word'].dtype == 'category'
+    assert a.words_df['word'].tolist() == ['the', 'fox', 'the', 'dog', 'a', 'fox', 'jumps', 'the', 'end']
+    assert a.word_frequencies.to_dict() == {'the': 3, 'fox': 2, 'dog': 1, 'a': 1, 'jumps': 1, 'end': 1}
+    assert a.word_frequencies.index[0] == 'the'
+
+def test_clean_text():
+    assert clean_text('The state-of-the-art fox, jumps! - The Daily News') == 'state art fox jump'
+    assert clean_text('Fox jumps!\nsecond line') == 'Fox jump second line'
+    assert clean_text('Fox jumps\n-\nThe Daily News') == 'Fox jump'
+    texts = Series(['A fox - News', 'A fox - News', 'Another fox'], index=[3, 5, 7])
+    assert clean_texts(texts).to_dict() == {3: 'fox', 5: 'fox', 7: 'Another fox'}
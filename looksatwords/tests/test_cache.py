@@ -0,0 +1,46 @@
+import pytest
+
+from looksatwords.cache import CacheMiss, DiskCache, LRUCache
+
+
+def test_disk_cache(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    assert cache.get_or_set(DiskCache.key('a'), lambda: 1) == 1
+    assert cache.get_or_set(DiskCache.key('a'), lambda: 2) == 1
+    cache.set(DiskCache.key('b'), 2)
+    cache.get(DiskCache.key('a'))
+    cache.set(DiskCache.key('c'), 3)
+    assert len(cache) == 2
+    assert cache.get(DiskCache.key('b')) is None
+    assert cache.stats()['hits'] == 2
+
+
+def test_disk_cache_replay(tmp_path):
+    DiskCache(str(tmp_path / 'cache.sqlite')).set(DiskCache.key('a'), 'cached')
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), mode='replay')
+    assert cache.get_or_set(DiskCache.key('a'), lambda: 'computed') == 'cached'
+    with pytest.raises(CacheMiss):
+        cache.get_or_set(DiskCache.key('b'), lambda: 'computed')
+
+
+def test_lru_cache(tmp_path):
+    cache = LRUCache(maxsize=2)
+    cache.set(('a', 'n'), 'a')
+    cache.set(('b', 'n'), 'b')
+    assert cache.get(('a', 'n')) == 'a'
+    cache.set(('c', 'n'), 'c')
+    assert cache.get(('b', 'n')) is None
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    cache.save(str(tmp_path / 'cache.json'))
+    loaded = LRUCache().load(str(tmp_path / 'cache.json'))
+    assert loaded.get(('c', 'n')) == 'c'
+
+    assert loaded.drain() == {'items': [], 'hits': 1, 'misses': 0}
+    loaded.track()
+    loaded.set('d', 'd')
+    loaded.get('e')
+    drained = loaded.drain()
+    assert drained == {'items': [('d', 'd')], 'hits': 0, 'misses': 1}
+    assert loaded.drain() == {'items': [], 'hits': 0, 'misses': 0}
+    assert LRUCache().merge(drained).get('d') == 'd'
@@ -1,4 +1,5 @@
 from looksatwords.dataio import DataIO
+from pandas import DataFrame
 
 
 def test_dataio_init():
@@ -14,4 +15,66 @@ def test_dataio_saving():
     assert not dataio.df.empty
     loaded = dataio.load()
     assert not loaded.empty
-    assert loaded.columns.tolist() == ['test']
\ No newline at end of file
+    assert loaded.columns.tolist() == ['test']
+
+
+def test_dataio_backends(tmp_path):
+    for backend in ['tinydb', 'sqlite', 'parquet']:
+        dataio = DataIO(db_path=str(tmp_path / 'data.json'), backend=backend)
+        dataio.df = DataFrame({'headline': ['a', 'b'], 'publisher': [{'title': 'a'}, {'title': 'b'}]})
+        dataio.save()
+        dataio.df = DataFrame({'headline': ['c'], 'publisher': [{'title': 'c'}]})
+        dataio.save()
+        loaded = dataio.load()
+        assert loaded['headline'].tolist() == ['a', 'b', 'c']
+        assert loaded['publisher'].tolist() == [{'title': 'a'}, {'title': 'b'}, {'title': 'c'}]
+        assert dataio.load(columns=['headline']).columns.tolist() == ['headline']
+        assert dataio.load(where=('headline', ['a', 'c']))['publisher'].tolist() == [{'title': 'a'}, {'title': 'c'}]
+        assert dataio.load(where=('missing', ['a'])).empty
+
+
+def test_sqlite_table_names(tmp_path):
+    dataio = DataIO(db_path=str(tmp_path / 'data.sqlite'), table_name='json_columns', backend='sqlite')
+    dataio.df = DataFrame({'name': ['a'], 'publisher': [{'title': 'a'}]})
+    dataio.save()
+    assert dataio.load().to_dict('records') == [{'name': 'a', 'publisher': {'title': 'a'}}]
+
+
+def test_dataio_validate(tmp_path):
+    from pandas import concat
+    from pandera.errors import SchemaError
+    from pytest import raises
+
+    from looksatwords.metrics import metrics
+    from looksatwords.validator import gnews_data_schema
+
+    def articles(headlines):
+        return DataFrame(
+            {
+                'headline': headlines,
+                'description': 'story',
+                'url': 'https://example.com',
+                'published date': 'Mon, 01 Jan 2024 00:00:00 GMT',
+                'publisher': [{'title': 'a'}] * len(headlines),
+            }
+        )
+
+    dataio = DataIO(db_path=str(tmp_path / 'data.json'), validation='new')
+    dataio.df_schema = gnews_data_schema
+    metrics.reset()
+    dataio.df = articles(['a', 'b'])
+    dataio.validate()
+    dataio.df = concat([dataio.df, articles(['c'])], ignore_index=True)
+    dataio.validate()
+    assert [call['rows'] for call in metrics.calls if call['stage'] == 'validate.gnews_data'] == [2, 1]
+
+    invalid = articles(['a', 'b', None])
+    dataio.df = invalid
+    with raises(SchemaError):
+        dataio.validate()
+    dataio.validation_rows = 2
+    assert dataio.validate(mode='head') is invalid
+    assert dataio.validate(mode='off') is invalid
+    dataio.validation_rows = 3
+    with raises(SchemaError):
+        dataio.validate(mode='random')
@@ -0,0 +1,65 @@
+from pandas import DataFrame
+
+from looksatwords.dataio import DataIO
+from looksatwords.dedup import Deduplicator
+
+
+def articles(headlines, urls):
+    return DataFrame(
+        {
+            'headline': headlines,
+            'description': ['description'] * len(urls),
+            'url': urls,
+            'published date': ['Mon, 01 Jan 2024 00:00:00 GMT'] * len(urls),
+            'publisher': [{'title': 'Example'}] * len(urls),
+        }
+    )
+
+
+def test_dedup(tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    deduplicator = Deduplicator(db_path=db_path)
+    df = deduplicator.dedup(articles(['a', 'b', 'B', 'a'], ['u1', 'u2', 'u3', 'u1']))
+    assert df['url'].tolist() == ['u1', 'u2']
+    assert deduplicator.stats['url_duplicates'] == 1
+    assert deduplicator.stats['content_duplicates'] == 1
+
+    # Not committed, as if the run failed before saving the articles
+    assert Deduplicator(db_path=db_path).dedup(articles(['a'], ['u1']))['url'].tolist() == ['u1']
+
+    saved = DataIO(db_path=db_path)
+    deduplicator.attach(saved)
+    saved.df = df.iloc[:1]
+    saved.save()
+    assert len(deduplicator.pending) == 1
+    deduplicator = Deduplicator(db_path=db_path)
+    df = deduplicator.dedup(articles(['a', 'b', 'c'], ['u1', 'u2', 'u4']))
+    assert df['url'].tolist() == ['u2', 'u4']
+
+
+def test_dedup_near_duplicates(tmp_path):
+    deduplicator = Deduplicator(db_path=str(tmp_path / 'data.json'), near_duplicates=True)
+    df = deduplicator.dedup(
+        articles(
+            [
+                'Stocks rally as markets cheer the latest inflation report today',
+                'Stocks rally as markets cheer the latest inflation report today!',
+                'Local team wins the championship after a dramatic final',
+            ],
+            ['u1', 'u2', 'u3'],
+        )
+    )
+    assert df['url'].tolist() == ['u1', 'u3']
+    assert deduplicator.stats['near_duplicates'] == 1
+
+
+def test_dedup_commit_empty(tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    deduplicator = Deduplicator(db_path=db_path)
+    deduplicator.dedup(articles(['a'], ['u1']))
+    saved = DataIO(db_path=db_path)
+    deduplicator.attach(saved)
+    for df in [DataFrame(), DataFrame({'query': []}), DataFrame({'query': ['keyword=none']})]:
+        saved.df = df
+        saved.save()
+    assert len(deduplicator.pending) == 1
@@ -1,4 +1,5 @@
-from looksatwords.gatherer import GnewsGatherer
+from looksatwords.concurrency import HostLimiter
+from looksatwords.gatherer import GnewsGatherer, GnewsQuery
 
 def test_gnews_gatherer():
     gnews_gatherer = GnewsGatherer()
@@ -6,3 +7,10 @@ def test_gnews_gatherer():
     df = gnews_gatherer.validate()
     assert not df.empty
     
+
+def test_gnews_gatherer_concurrent(stub_gnews):
+    query = GnewsQuery(keyword='alpha', topic='beta', site='gamma', location='delta')
+    gnews_gatherer = GnewsGatherer(q=query, limiter=HostLimiter(max_concurrent=2))
+    df = gnews_gatherer.gather()
+    assert sorted(df['headline']) == ['keyword=alpha', 'location=delta', 'site=gamma', 'topic=beta']
+    assert stub_gnews.max_in_flight == 2
@@ -1,3 +1,12 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import ollama
+import pytest
+
+from looksatwords import llm
 from looksatwords.generator import GnewsGenerator
 
 def test_generator():
@@ -5,3 +14,98 @@ def test_generator():
     gnews_generator.generate()
     df = gnews_generator.validate()
     assert not df.empty
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/chat with the question asked, failing the very first request"""
+    lock = Lock()
+    requests = 0
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):
+        cls = StubOllamaHandler
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with cls.lock:
+            cls.requests += 1
+            first = cls.requests == 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.1)
+        if first:
+            status, body = 500, {'error': 'warming up'}
+        else:
+            question = request['messages'][-1]['content']
+            status, body = 200, {
+                'model': request['model'],
+                'message': {'role': 'assistant', 'content': question},
+                'done': True,
+            }
+        with cls.lock:
+            cls.in_flight -= 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_ollama(monkeypatch):
+    StubOllamaHandler.requests = StubOllamaHandler.max_in_flight = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(llm, 'news_bot', ollama.Client(host=f'http://127.0.0.1:{server.server_port}'))
+    yield StubOllamaHandler
+    server.shutdown()
+
+
+def test_generator_concurrent(stub_ollama):
+    gnews_generator = GnewsGenerator(n=6, concurrency=3)
+    df = gnews_generator.generate()
+    assert len(df) == 6
+    assert all(headline in description for headline, description in zip(df['headline'], df['description']))
+    assert stub_ollama.requests == 13
+    assert 1 < stub_ollama.max_in_flight <= 3
+
+
+def test_generator_cache_replay(stub_ollama, tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, 'cache', None)
+    llm.use_cache(str(tmp_path / 'llm_cache.sqlite'))
+    generated = GnewsGenerator(n=3, seed=7).generate()
+    requests = stub_ollama.requests
+
+    cache = llm.use_cache(str(tmp_path / 'llm_cache.sqlite'), mode='replay')
+    replayed = GnewsGenerator(n=3, seed=7).generate()
+    assert stub_ollama.requests == requests
+    assert replayed['headline'].tolist() == generated['headline'].tolist()
+    assert cache.hits == 6
+
+
+def test_generator_seed():
+    assert GnewsGenerator(seedword='fox').seed != GnewsGenerator(seedword='fox').seed
+    assert GnewsGenerator(seedword='fox', seed=7).seed == 7
+
+
+def test_retry_server_errors_only():
+    from looksatwords.concurrency import retry
+
+    calls = []
+
+    def fail(status):
+        calls.append(status)
+        raise ollama.ResponseError('failed', status_code=status)
+
+    for status, attempts in [(404, 1), (503, 3)]:
+        calls.clear()
+        with pytest.raises(ollama.ResponseError):
+            retry(
+                lambda: fail(status),
+                retries=2,
+                backoff=0,
+                exceptions=(ollama.ResponseError,),
+                retryable=llm.retryable,
+            )
+        assert len(calls) == attempts
@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+
+from looksatwords.hud import LogProgress, hud, set_headless
+
+
+@hud
+def count(n, hud):
+    task = hud.add_task('[cyan]Test:Counting...', total=n)
+    for _ in range(n):
+        hud.update(task, advance=1)
+    return hud
+
+
+def test_headless(caplog):
+    set_headless(True, log_interval=0)
+    try:
+        with caplog.at_level(logging.INFO, logger='rich'):
+            tasks = count(3)
+    finally:
+        set_headless(False, log_interval=5.0)
+
+    assert isinstance(tasks, LogProgress)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[:2] == ['Test:Counting... 1/3', 'Test:Counting... 2/3']
+    assert messages[2].startswith('Test:Counting... 3/3 done in')
+    assert tasks.tasks == {}
+
+
+def test_log_progress_throttled(caplog):
+    progress = LogProgress(interval=60)
+    with caplog.at_level(logging.DEBUG, logger='rich'):
+        task = progress.add_task('Test', total=None)
+        for _ in range(100):
+            progress.update(task, advance=1)
+        progress.update(task, total=100)
+
+    assert [record.levelname for record in caplog.records] == ['DEBUG']
+
+
+@hud
+def stream(hud, fail=False):
+    hud.add_task('[cyan]Test:Streaming...', total=None)
+    if fail:
+        raise ValueError('failed')
+    return hud
+
+
+def test_headless_unfinished_tasks():
+    set_headless(True)
+    try:
+        assert stream().tasks == {}
+        with pytest.raises(ValueError):
+            stream(fail=True)
+        tasks = count(0)
+    finally:
+        set_headless(False, log_interval=5.0)
+    assert tasks.tasks == {}
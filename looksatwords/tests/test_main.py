@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+
+def imported_modules(statement):
+    """Top level modules imported by running statement in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, '-c', f'{statement}; import sys; print(" ".join(sys.modules))'],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return {name.split('.')[0] for name in output.split()}
+
+
+def test_cli_imports_lazily():
+    modules = imported_modules('import looksatwords.__main__')
+    assert not modules & {'pandas', 'nltk', 'bokeh', 'matplotlib', 'ollama', 'trogon'}
+
+
+def test_analyzer_loads_nltk_lazily():
+    assert 'nltk' not in imported_modules('import looksatwords.analyzer')
+
+
+def test_cli_options():
+    from click.testing import CliRunner
+
+    from looksatwords.__main__ import cli
+
+    output = CliRunner().invoke(cli, ['cli', '--help']).output
+    assert '--seed' in output and '--llm_cache' in output and '--llm_cache_mode' in output
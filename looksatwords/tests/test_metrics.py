@@ -0,0 +1,60 @@
+import json
+import pstats
+
+from pandas import DataFrame
+
+from looksatwords.hud import hud
+from looksatwords.metrics import Metrics, metrics
+
+
+class Stage:
+    def __init__(self):
+        self.df = DataFrame({'a': range(5)})
+
+    @hud
+    def inner(self, hud):
+        return self.df.head(2)
+
+    @hud
+    def outer(self, hud):
+        self.inner()
+        self.inner()
+
+
+def test_hud_metrics():
+    metrics.reset()
+    Stage().outer()
+    summary = metrics.summary()
+
+    assert summary['Stage.inner']['calls'] == 2
+    assert summary['Stage.inner']['rows'] == 4
+    assert summary['Stage.outer']['rows'] == 5
+    assert summary['Stage.outer']['wall_seconds'] >= summary['Stage.inner']['wall_seconds']
+    assert [call['depth'] for call in metrics.calls] == [1, 1, 0]
+
+    exported = json.loads(metrics.to_json())
+    assert exported['stages']['Stage.outer']['calls'] == 1
+    text = metrics.to_openmetrics()
+    assert 'looksatwords_stage_calls_total{stage="Stage.inner"} 2' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_metrics_profile(tmp_path):
+    profiled = Metrics(profile_path=str(tmp_path))
+    with profiled.measure('outer'):
+        with profiled.measure('inner'):
+            sum(range(1000))
+
+    assert [path.name for path in tmp_path.iterdir()] == ['outer-2.prof']
+    pstats.Stats(str(tmp_path / 'outer-2.prof'))
+
+
+def test_metrics_max_calls():
+    capped = Metrics(max_calls=2)
+    for _ in range(5):
+        with capped.measure('stage') as record:
+            record['rows'] = 3
+
+    assert len(capped.calls) == 2
+    assert capped.summary()['stage']['calls'] == 5
+    assert capped.summary()['stage']['rows'] == 15
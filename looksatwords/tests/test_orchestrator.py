@@ -1,6 +1,12 @@
+from pandas import DataFrame
+
+from looksatwords.analyzer import Analyzer
+from looksatwords.dedup import Deduplicator
 from looksatwords.orchestrator import Orchestrator
-from looksatwords.gatherer import GnewsGatherer
-from looksatwords.generator import GnewsGenerator
+from looksatwords.rollup import Rollup
+from looksatwords.search import SearchIndex
+from looksatwords.gatherer import GnewsGatherer, GnewsQuery
+from looksatwords.generator import Generator, GnewsGenerator
 
 def test_orchestrator():
     g1 = GnewsGatherer()
@@ -17,4 +23,69 @@ def test_orchestrator():
     # for f in orchestrator.generators:
     #     assert f.df is not None
 
-    
\ No newline at end of file
+    
+
+def test_orchestrator_stream(stub_gnews, tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    query = GnewsQuery(keyword='alpha', topic='beta', site='gamma')
+    orchestrator = Orchestrator(
+        gatherers=[GnewsGatherer(q=query, db_path=db_path), GnewsGatherer(q=query, db_path=db_path)],
+        deduplicator=Deduplicator(db_path=db_path),
+    )
+    analyzer = Analyzer(db_path=db_path)
+    stats = orchestrator.stream(chunk_size=1, analyzer=analyzer)
+    assert stats == {'chunks': 6, 'gathered': 6, 'analyzed': 3}
+    assert len(analyzer.load()) == 3
+    assert orchestrator.word_counts['about'] == 3
+
+
+def test_orchestrator_run(stub_gnews, tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    orchestrator = Orchestrator(
+        gatherers=[GnewsGatherer(q=GnewsQuery(keyword='alpha'), db_path=db_path)],
+        deduplicator=Deduplicator(db_path=db_path),
+    )
+    scheduler = orchestrator.run(visualize=False)
+    assert set(scheduler.timings) == {'gather', 'dedup', 'save', 'analyze'}
+    assert scheduler.critical_path()[0][0] == 'gather'
+    assert scheduler.timings['analyze']['start'] >= scheduler.timings['save']['end']
+    assert orchestrator.analyzer.df is not None
+
+
+class StubGenerator(Generator):
+    def generate(self):
+        self.df = DataFrame([{
+            'headline': 'generated',
+            'description': 'about generated',
+            'url': 'http://example.com/generated',
+            'published date': 'Mon, 01 Jan 2024 00:00:00 GMT',
+            'publisher': {'href': 'http://example.com', 'title': 'Example'},
+        }])
+        return self.df
+
+
+def test_orchestrator_run_generated(stub_gnews, tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    generator = StubGenerator(db_path=db_path)
+    orchestrator = Orchestrator(
+        gatherers=[GnewsGatherer(q=GnewsQuery(keyword='alpha'), db_path=db_path)],
+        generators=[generator],
+        deduplicator=Deduplicator(db_path=db_path),
+    )
+    scheduler = orchestrator.run(visualize=False)
+    assert scheduler.timings['save']['start'] >= scheduler.timings['generate']['end']
+    assert len(generator.load()) == 1
+    assert 'generated' in set(orchestrator.analyzer.df['headline'])
+
+
+def test_orchestrator_analyze_rollup(stub_gnews, tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    orchestrator = Orchestrator(
+        gatherers=[GnewsGatherer(q=GnewsQuery(keyword='alpha'), db_path=db_path)],
+        rollup=Rollup(db_path=db_path),
+        search_index=SearchIndex(db_path=db_path),
+    )
+    orchestrator.gather()
+    orchestrator.analyze()
+    assert orchestrator.rollup.query(freq=None, by=[])['count'].tolist() == [1]
+    assert len(orchestrator.search_index) == 1
@@ -0,0 +1,45 @@
+from pandas import DataFrame
+
+from looksatwords.dataio import DataIO
+from looksatwords.rollup import Rollup
+
+
+def analyzed_rows(dates, publishers, compounds):
+    return DataFrame(
+        {
+            'published date': dates,
+            'publisher': [{'href': '', 'title': publisher} for publisher in publishers],
+            'query': 'keyword=fox',
+            'headline_compound': compounds,
+            'headline_wordcount': [4] * len(dates),
+        }
+    )
+
+
+def test_rollup(tmp_path):
+    db_path = str(tmp_path / 'data.json')
+    analyzer = DataIO(db_path=db_path, table_name='analyzer')
+    rollup = Rollup(db_path=db_path).attach(analyzer)
+
+    analyzer.df = analyzed_rows(
+        ['Mon, 01 Jan 2024 10:15:00 GMT', 'Mon, 01 Jan 2024 11:00:00 GMT', 'Tue, 02 Jan 2024 09:00:00 GMT'],
+        ['A', 'A', 'B'],
+        [0.5, -0.5, 1.0],
+    )
+    analyzer.save()
+    analyzer.df = analyzed_rows(['2024-01-01T23:59:00.123456', 'not a date'], ['A', 'A'], [0.3, 0.9])
+    analyzer.save()
+
+    daily = rollup.query(freq='D', metrics=['headline_compound'])
+    a = daily.loc[('2024-01-01', 'A')]
+    assert a['count'] == 3
+    assert abs(a['headline_compound_mean'] - 0.1) < 1e-9
+    assert abs(a['headline_compound_std'] - DataFrame({'x': [0.5, -0.5, 0.3]})['x'].std(ddof=0)) < 1e-9
+    assert daily.loc[('2024-01-02', 'B'), 'count'] == 1
+
+    hourly = rollup.query(freq='h', by=[], start='2024-01-01T11:00', end='2024-01-02', publisher='A')
+    assert list(hourly['count']) == [1, 1]
+    assert rollup.query(freq=None, by=['query'])['headline_wordcount_mean'].tolist() == [4.0]
+
+    reloaded = Rollup(db_path=db_path)
+    assert reloaded.query().equals(rollup.query())
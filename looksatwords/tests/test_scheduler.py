@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from looksatwords.scheduler import Scheduler
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_scheduler():
+    scheduler = Scheduler()
+    scheduler.add('a', lambda: sleep(0.3))
+    scheduler.add('b', lambda: sleep(0.2))
+    scheduler.add('c', lambda: sleep(0.1), deps=['a', 'b'])
+    start = time.time()
+    results = scheduler.run()
+    assert time.time() - start < 0.55
+    assert results['a'] == 0.3
+    assert scheduler.timings['c']['start'] >= scheduler.timings['a']['end']
+    path, wall = scheduler.critical_path()
+    assert path == ['a', 'c']
+    assert wall == pytest.approx(0.4, abs=0.05)
+
+
+def test_scheduler_cycle():
+    scheduler = Scheduler()
+    scheduler.add('a', lambda: None, deps=['b'])
+    scheduler.add('b', lambda: None, deps=['a'])
+    with pytest.raises(ValueError):
+        scheduler.run()
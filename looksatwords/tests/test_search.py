@@ -0,0 +1,49 @@
+from pandas import DataFrame
+
+from looksatwords.dataio import DataIO, article_ids
+from looksatwords.search import SearchIndex
+
+
+def articles(headlines):
+    return DataFrame(
+        {
+            'headline': headlines,
+            'description': ['the story'] * len(headlines),
+            'url': [f'https://example.com/{headline}' for headline in headlines],
+            'published date': 'Mon, 01 Jan 2024 00:00:00 GMT',
+        }
+    )
+
+
+def test_search_index(tmp_path):
+    dataio = DataIO(db_path=str(tmp_path / 'data.json'))
+    index = SearchIndex(str(tmp_path / 'search.sqlite')).attach(dataio)
+    dataio.df = articles(['brown fox jumps', 'lazy dog sleeps', 'brown dog barks'])
+    dataio.save()
+    dataio.save()
+    dataio.df = articles(['lazy fox sleeps'])
+    dataio.save()
+    assert len(index) == 4
+
+    headlines = ['brown fox jumps', 'lazy dog sleeps', 'brown dog barks', 'lazy fox sleeps']
+    ids = dict(zip(headlines, article_ids(articles(headlines))))
+
+    def found(query, **kwargs):
+        return {headline for headline, article_id in ids.items() if article_id in index.search(query, **kwargs)}
+
+    assert found('dog') == {'lazy dog sleeps', 'brown dog barks'}
+    assert found('brown dog') == {'brown dog barks'}
+    assert found('fox OR barks') == {'brown fox jumps', 'lazy fox sleeps', 'brown dog barks'}
+    assert found('lazy -fox') == {'lazy dog sleeps'}
+    assert found('-dog', fields=['headline']) == {'brown fox jumps', 'lazy fox sleeps'}
+    assert found('"brown dog"') == {'brown dog barks'}
+    assert found('"dog brown"') == set()
+    assert found('story', fields=['headline']) == set()
+    assert len(index.filter(articles(headlines), 'sleeps')) == 2
+
+    assert len(SearchIndex(str(tmp_path / 'search.sqlite'))) == 4
+
+
+def test_search_index_path(tmp_path):
+    index = SearchIndex(db_path=str(tmp_path / 'data.json'))
+    assert index.path == str(tmp_path / 'data.search.sqlite')
@@ -1,4 +1,74 @@
-from looksatwords.visualizer import Visualizer
+from pandas import DataFrame
+
+from looksatwords.visualizer import (
+    Visualizer,
+    boxplot_groups,
+    pie_cart_wordcount,
+    plot_scatter,
+    plot_scatter_sentiment,
+    plots,
+    top_words,
+)
 from looksatwords.analyzer import Analyzer
 from looksatwords.gatherer import GnewsGatherer
 
+
+def analyzed_df(n=20):
+    return DataFrame(
+        {
+            'headline': [f'fox number {i} jumps' for i in range(n)],
+            'description': [f'a story about fox {i}' for i in range(n)],
+            'headline_positive': [i / n for i in range(n)],
+            'headline_negative': [1 - i / n for i in range(n)],
+            'headline_neutral': [0.5] * n,
+            'headline_compound': [2 * i / n - 1 for i in range(n)],
+            'headline_wordcount': [4] * n,
+        }
+    )
+
+
+def test_make_plots_cached(tmp_path):
+    output_path = f'{tmp_path}/output/'
+    visualizer = Visualizer(db_path=str(tmp_path / 'data.json'), output_path=output_path, workers=2)
+    assert visualizer.workers == 1
+    visualizer.df = analyzed_df()
+    visualizer.make_plots()
+    assert set(visualizer.plot_files) == set(plots)
+    first = dict(visualizer.plot_files)
+
+    again = Visualizer(db_path=str(tmp_path / 'data.json'), output_path=output_path, workers=1)
+    again.folder_path = f'{output_path}next/'
+    again.df = analyzed_df()
+    again.df.loc[0, 'headline_compound'] = 0.0
+    again.make_plots()
+
+    changed = {name for name in plots if again.plot_files[name] != first[name]}
+    assert changed == {'scatter_sentiment', 'scatter', 'sentiment_scatter', 'boxplot'}
+    assert all(file.startswith(f'{output_path}next/') for name, file in again.plot_files.items() if name in changed)
+
+
+def test_top_words():
+    words = DataFrame({'word': ['fox'] * 5 + ['dog'] * 3 + ['cat'] * 2 + ['owl']})
+    assert top_words(words, 2).to_dict() == {'fox': 5, 'dog': 3, 'other': 3}
+    assert top_words(words, 2, other=None).to_dict() == {'fox': 5, 'dog': 3}
+    assert top_words(words, 10).to_dict() == {'fox': 5, 'dog': 3, 'cat': 2, 'owl': 1}
+
+    pie = pie_cart_wordcount(words, top=2)
+    assert list(pie.renderers[0].data_source.data['word']) == ['fox', 'dog', 'other']
+
+
+def test_make_plots_large_data(tmp_path):
+    df = analyzed_df(40)
+    df['publisher'] = [{'href': '', 'title': f'Publisher {i % 3}'} for i in range(40)]
+    df['published date'] = 'Mon, 01 Jan 2024 00:00:00 GMT'
+    visualizer = Visualizer(db_path=str(tmp_path / 'data.json'), output_path=f'{tmp_path}/output/', workers=1)
+    visualizer.df = df
+    visualizer.make_plots(plot_type='boxplot', max_points=10)
+    with open(visualizer.plot_files['boxplot']) as f:
+        html = f.read()
+    assert 'Publisher 2' in html and 'fox number 1 jumps' not in html
+
+    assert list(boxplot_groups(df, 'date').unique()) == ['2024-01-01']
+    hexbins = plot_scatter_sentiment(df, max_points=10)
+    assert hexbins.output_backend == 'webgl'
+    assert len(plot_scatter(df, max_points=10).renderers[0].data_source.data['index']) == 10
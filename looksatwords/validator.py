@@ -1,14 +1,16 @@
 
 from pandera import Column, String, DataFrameSchema, Index, Object, Float, Int
 
+from .metrics import metrics
+
 class BaseSchema:
     @staticmethod
     def generate_columns(prefix, suffixes, col_type):
         return {f"{prefix}_{suffix}": Column(col_type, nullable=False) for suffix in suffixes}
 
     @staticmethod
-    def create_schema(columns_spec):
-        return DataFrameSchema(columns_spec, index=Index(int))
+    def create_schema(columns_spec, name=None):
+        return DataFrameSchema(columns_spec, index=Index(int), name=name)
 
 # Define the common suffixes for abstracted_headline and abstracted_description
 sentiment_suffixes = ['sentiment', 'positive', 'negative', 'neutral', 'compound']
@@ -16,7 +18,7 @@ wordcount_suffix = ['wordcount']
 pos_suffixes = ['noun', 'verb', 'adjective', 'adverb', 'pronoun', 'conjunction', 'preposition', 'interjection']
 
 class RawDataSchema(BaseSchema):
-    schema = BaseSchema.create_schema({})
+    schema = BaseSchema.create_schema({}, name='raw_data')
 
 class GNewsDataSchema(BaseSchema):
     schema = BaseSchema.create_schema({
@@ -25,7 +27,7 @@ class GNewsDataSchema(BaseSchema):
         'url': Column(String, nullable=False),
         'published date': Column(String, nullable=False),
         'publisher': Column(Object, nullable=False),
-    })
+    }, name='gnews_data')
 
 class AnalyzedDataSchema(BaseSchema):
     columns_spec = {
@@ -43,10 +45,48 @@ class AnalyzedDataSchema(BaseSchema):
         **BaseSchema.generate_columns('abstracted_description', wordcount_suffix, Int),
         **BaseSchema.generate_columns('abstracted_description', pos_suffixes, Int),
     }
-    schema = BaseSchema.create_schema(columns_spec)
+    schema = BaseSchema.create_schema(columns_spec, name='analyzed_data')
 
 # Instantiate schemas
 raw_data_schema = RawDataSchema.schema
 gnews_data_schema = GNewsDataSchema.schema
 analyzed_data_schema = AnalyzedDataSchema.schema
-visualized_data_schema = AnalyzedDataSchema.schema
\ No newline at end of file
+visualized_data_schema = AnalyzedDataSchema.schema
+
+# Validation modes, see validate
+validation_modes = ['full', 'new', 'head', 'random', 'off']
+
+
+def validate(df, schema, mode='full', n=1000, start=0, seed=None):
+    """
+    Validate df against schema, in place, and time it as the validate.{schema name} stage of metrics.
+    The schemas are built once, at import, so their checks are reused by every call.
+    :param mode: str, rows to validate
+    - full: all rows
+    - new: the rows from start on, those added since the last validation
+    - head: the first n rows, for trusted sources
+    - random: n random rows, for trusted sources
+    - off: none
+    :param n: int, number of rows validated by head and random
+    :param start: int, first row validated by new
+    :param seed: optional, int, random state of random
+    :return: df
+    """
+    if mode not in validation_modes:
+        raise ValueError(f'Unknown validation mode {mode}, expected one of {validation_modes}')
+    if mode == 'off' or df.empty:
+        return df
+    with metrics.measure(f'validate.{schema.name}') as record:
+        if mode == 'new':
+            schema.validate(df.iloc[start:], inplace=True)
+            record['rows'] = max(len(df) - start, 0)
+        elif mode == 'head':
+            schema.validate(df, head=n, inplace=True)
+            record['rows'] = min(n, len(df))
+        elif mode == 'random':
+            schema.validate(df, sample=min(n, len(df)), random_state=seed, inplace=True)
+            record['rows'] = min(n, len(df))
+        else:
+            schema.validate(df, inplace=True)
+            record['rows'] = len(df)
+    return df
@@ -1,30 +1,47 @@
 import datetime
-from os import makedirs, path
+import json
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count, makedirs, path
 
 import matplotlib.pyplot as plt
-from bokeh.io import output_file, save
+from bokeh.io import save
 from bokeh.models import ColumnDataSource, HoverTool, LinearColorMapper, Whisker
 from bokeh.plotting import figure
+from bokeh.resources import CDN
 from bokeh.transform import cumsum
-from nltk import pos_tag
-from numpy import array, pi
+from numpy import array, ndarray, pi
+from pandas import Series, concat
+from pandas.util import hash_pandas_object
 from PIL import Image
 from wordcloud import WordCloud, get_single_color_func
 
-from .analyzer import Analyzer
-from .hud import hud
+from .analyzer import Analyzer, word_frequencies
+from .dataio import published_dates, publisher_titles
+from .hud import hud, set_headless
 from .validator import visualized_data_schema
 
 
 class Visualizer(Analyzer):
-    def __init__(self, db_path='data.json', output_path='output/'):
-        super().__init__(db_path=db_path)
+    def __init__(self, db_path='data.json', output_path='output/', backend='tinydb', workers=1):
+        """
+        :param workers: int, maximum number of processes rendering plots at once,
+        no more are started than there are plots to render. They are started by a fork server,
+        so rendering is safe from threads, e.g. the stages of Orchestrator.run
+        - 1: render in this process (default)
+        - None: one process per CPU core
+        """
+        super().__init__(db_path=db_path, backend=backend)
+        self.plot_workers = workers
         self.df_schema = visualized_data_schema
         self.table_name = self.table_name + '_visualizer'
         self.output_path = output_path
         self.check_output_path()
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
         self.folder_path = f'{self.output_path}{timestamp}/'
+        self.manifest_path = path.join(self.output_path, 'manifest.json')
+        self.plot_files = {}
 
     def check_output_path(self):
         if not path.exists(self.output_path):
@@ -32,14 +49,33 @@ class Visualizer(Analyzer):
 
     def save_plot(self, plot, filename, wordcloud=False):
         makedirs(self.folder_path, exist_ok=True)
-        output_file(f'{self.folder_path}{filename}.html')
         if wordcloud:
             plot.savefig(f'{self.folder_path}{filename}.png')
         else:
-            save(plot)
+            save(plot, filename=f'{self.folder_path}{filename}.html', resources=CDN, title=filename)
+
+    def load_manifest(self):
+        """Fingerprint of the input data and file of the last render of each plot"""
+        if not path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
 
     @hud
-    def make_plots(self, hud, plot_type='all', mask=None):
+    def make_plots(
+        self,
+        hud,
+        plot_type='all',
+        mask=None,
+        pie_words=20,
+        cloud_words=500,
+        max_points=None,
+        boxplot_by='publisher',
+    ):
         '''
         Make plots for the data in the dataframe
         :param plot_type: str, type of plot to make
@@ -55,37 +91,72 @@ class Visualizer(Analyzer):
         - numpy array: Image mask
         - str: Path to image file
         - None: No mask
+        :param pie_words: int, number of words in the pie chart, the others are summed into 'other'
+        :param cloud_words: int, number of words in the word cloud
+        :param max_points: optional, int, number of articles above which the sentiment plots
+        switch to large data mode, default large_data_rows:
+        WebGL rendering, hexbins for scatter_sentiment, a sample of max_points articles
+        for scatter and sentiment_scatter, and a box per boxplot_by group for boxplot
+        :param boxplot_by: str, how the boxplot groups articles in large data mode
+        - publisher: by publisher, the least frequent ones grouped as 'other'
+        - date: by day published
+
+        Each plot only gets the columns it uses, and plots whose data and mask have
+        the same fingerprint as their last render in output_path are not rendered again.
+        The other plots are rendered by up to self.plot_workers processes at once.
+        self.plot_files holds the file of each plot.
         '''
-
-        task = hud.add_task("[white]Visualizer:Making plots...", total=7)
-        self.build_words_df()
+        names = [name for name in plots if plot_type in (name, 'all')]
+        task = hud.add_task("[white]Visualizer:Making plots...", total=len(names) + 1)
+        word_data = {}
+        if word_plots.intersection(names):
+            self.build_words_df()
+            word_data = {
+                'word_cloud': top_words(self.word_frequencies, cloud_words, other=None),
+                'word_count_pie': top_words(self.word_frequencies, pie_words),
+            }
         hud.update(task, advance=1)
 
-        if plot_type == 'word_cloud' or plot_type == 'all':
-            self.save_plot(
-                word_cloud(self.words_df, mask=mask), 'word_cloud', wordcloud=True
-            )
-            hud.update(task, advance=1)
-
-        if plot_type == 'word_count_pie' or plot_type == 'all':
-            self.save_plot(pie_cart_wordcount(self.words_df), 'word_count_pie')
-            hud.update(task, advance=1)
-
-        if plot_type == 'scatter_sentiment' or plot_type == 'all':
-            self.save_plot(plot_scatter_sentiment(self.df), 'scatter_sentiment')
-            hud.update(task, advance=1)
-
-        if plot_type == 'scatter' or plot_type == 'all':
-            self.save_plot(plot_scatter(self.df), 'scatter')
-            hud.update(task, advance=1)
-
-        if plot_type == 'sentiment_scatter' or plot_type == 'all':
-            self.save_plot(plot_sentiment_scatter(self.df), 'sentiment_scatter')
-            hud.update(task, advance=1)
-
-        if plot_type == 'boxplot' or plot_type == 'all':
-            self.save_plot(boxplot(self.df), 'boxplot')
-            hud.update(task, advance=1)
+        max_points = large_data_rows if max_points is None else max_points
+        manifest = self.load_manifest()
+        jobs = []
+        for name in names:
+            options = {}
+            if name in word_plots:
+                data = word_data[name]
+            else:
+                data = self.df[plot_columns[name]]
+                options['max_points'] = max_points
+                if name == 'boxplot' and len(data) > max_points:
+                    data = data.assign(group=boxplot_groups(self.df, boxplot_by))
+            digest = fingerprint(name, data, mask, options)
+            last = manifest.get(name)
+            if last is not None and last['fingerprint'] == digest and path.exists(last['file']):
+                self.plot_files[name] = last['file']
+                hud.update(task, advance=1)
+                continue
+            extension = 'png' if name == 'word_cloud' else 'html'
+            jobs.append((name, data, f'{self.folder_path}{name}.{extension}', mask, options, digest))
+
+        if jobs:
+            makedirs(self.folder_path, exist_ok=True)
+        args = [job[:5] for job in jobs]
+        workers = min(len(jobs), self.plot_workers or cpu_count() or 1)
+        if workers < 2:
+            files = (render_plot(*arg) for arg in args)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=set_headless)
+            files = executor.map(render_plot, *zip(*args))
+        try:
+            for (name, *_, digest), file in zip(jobs, files):
+                self.plot_files[name] = file
+                manifest[name] = {'fingerprint': digest, 'file': file}
+                hud.update(task, advance=1)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self.save_manifest(manifest)
 
         return self.df
 
@@ -168,19 +239,36 @@ def calculate_image_mask(file=None):
     return mask
 
 
+def top_words(words, k=20, other='other'):
+    """
+    The k most frequent words and their counts, most frequent first
+    :param words: words_df, or a Series of word counts like word_frequencies returns
+    :param other: optional, str, label of a last row summing the counts of the other words
+    """
+    counts = words if isinstance(words, Series) else word_frequencies(words)
+    top = counts.nlargest(k)
+    if other is not None and len(counts) > k:
+        top = concat([top, Series({other: counts.sum() - top.sum()})])
+    return top.rename('count')
+
+
 @hud
-def word_cloud(df, hud, mask=None):
+def word_cloud(df, hud, mask=None, top=500):
+    """
+    :param df: words_df, or a Series of word counts
+    :param top: int, number of most frequent words in the cloud
+    """
     wc_task = hud.add_task("[white]Visualizer:Creating Word Cloud...", total=2)
     wordcloud = WordCloud(
         width=1000,
         height=750,
         max_font_size=1000,
-        max_words=500,
+        max_words=top,
         background_color='darkgrey',
         mask=calculate_image_mask(mask),
     )
     hud.update(wc_task, advance=1)
-    wordcloud.generate_from_frequencies(frequencies=df['word'].value_counts().to_dict())
+    wordcloud.generate_from_frequencies(frequencies=top_words(df, top, other=None).to_dict())
     hud.update(wc_task, advance=1)
     plt.figure(figsize=(15, 10))
     plt.imshow(wordcloud, interpolation='bilinear')
@@ -189,16 +277,13 @@ def word_cloud(df, hud, mask=None):
 
 
 @hud
-def pie_cart_wordcount(df, hud):
+def pie_cart_wordcount(df, hud, top=20):
+    """
+    :param df: words_df, or a Series of word counts
+    :param top: int, number of most frequent words with their own wedge, the others share one
+    """
     wc_task = hud.add_task("[grey]Visualizer:Creating Word Count Pie Chart...", total=1)
-    plot_df = (
-        df['word']
-        .str.split(expand=True)
-        .stack()
-        .value_counts()
-        .reset_index()
-        .rename(columns={'index': 'word', 0: 'count'})
-    )
+    plot_df = top_words(df, top).rename_axis('word').reset_index()
     plot_df['angle'] = plot_df['count'] / plot_df['count'].sum() * 2 * pi
 
     p = figure(
@@ -228,11 +313,31 @@ def pie_cart_wordcount(df, hud):
     return p
 
 
+def sample(df, max_points):
+    """At most max_points rows of df, the same ones for the same df"""
+    return df.sample(max_points, random_state=0).sort_index() if len(df) > max_points else df
+
+
+def output_backend(df, max_points):
+    return 'webgl' if len(df) > max_points else 'canvas'
+
+
 @hud
-def plot_scatter_sentiment(df, hud):
+def plot_scatter_sentiment(df, hud, max_points=None):
+    """Above max_points articles, hexbins counting the articles instead of a point per article"""
     plot_scatter_sentiment_task = hud.add_task(
         "[grey]Visualizer:Creating Scatter Sentiment Plot...", total=1
     )
+    max_points = large_data_rows if max_points is None else max_points
+    if len(df) > max_points:
+        p = figure(min_width=1200, min_height=800, match_aspect=True, output_backend='webgl')
+        p.hexbin(df['headline_positive'], df['headline_negative'], size=0.02, palette='Viridis256')
+        p.xaxis.axis_label = 'Positivity'
+        p.yaxis.axis_label = 'Negativity'
+        p.title.text = f'Articles by sentiment ({len(df)})'
+        p.add_tools(HoverTool(tooltips=[('Articles', '@c')]))
+        hud.update(plot_scatter_sentiment_task, advance=1)
+        return p
     source = ColumnDataSource(df)
     p = figure(min_width=1200, min_height=800)
     radii = df['headline_compound']
@@ -257,16 +362,19 @@ def plot_scatter_sentiment(df, hud):
 
 
 @hud
-def plot_scatter(df, hud):
+def plot_scatter(df, hud, max_points=None):
+    """Above max_points articles, a sample of max_points of them rendered with WebGL"""
     plot_scatter_task = hud.add_task(
         "[grey]Visualizer:Creating Scatter Plot...", total=1
     )
-    source = ColumnDataSource(df)
+    max_points = large_data_rows if max_points is None else max_points
+    source = ColumnDataSource(sample(df, max_points))
     p = figure(
         title='Sentiment Analysis',
         x_axis_label='Neutral',
         y_axis_label='Pos/Neg/Compound',
         min_width=800,
+        output_backend=output_backend(df, max_points),
     )
     p.scatter(
         x='headline_neutral',
@@ -298,20 +406,23 @@ def plot_scatter(df, hud):
 
 
 @hud
-def plot_sentiment_scatter(df, hud):
+def plot_sentiment_scatter(df, hud, max_points=None):
+    """Above max_points articles, a sample of max_points of them rendered with WebGL"""
     plot_sentiment_scatter_task = hud.add_task(
         "[grey]Visualizer:Creating Sentiment Scatter Plot...", total=1
     )
+    max_points = large_data_rows if max_points is None else max_points
     p = figure(
         title='Sentiment Analysis',
         x_axis_label='Word Count',
         y_axis_label='Sentiment Score',
         min_width=800,
+        output_backend=output_backend(df, max_points),
     )
     p.scatter(
         x='headline_wordcount',
         y='headline_compound',
-        source=ColumnDataSource(df),
+        source=ColumnDataSource(sample(df, max_points)),
         size='headline_wordcount',
         color='blue',
     )
@@ -319,9 +430,65 @@ def plot_sentiment_scatter(df, hud):
     return p
 
 
+def boxplot_groups(df, by='publisher', max_groups=30):
+    """
+    Group of each article for the large data boxplot
+    :param by: str, 'publisher' for the publisher title, or 'date' for the day published
+    :param max_groups: int, publishers beyond the max_groups most frequent are grouped as 'other'
+    """
+    if by == 'date':
+        return published_dates(df).dt.strftime('%Y-%m-%d').fillna('unknown')
+    if by != 'publisher':
+        raise ValueError(f"Invalid boxplot grouping '{by}'. Valid groupings are: publisher, date")
+    publishers = publisher_titles(df)
+    top = publishers.value_counts().index[:max_groups]
+    return publishers.where(publishers.isin(top), 'other')
+
+
+def group_quartiles(df, column='headline_compound'):
+    """Quartiles, whiskers at 1.5 interquartile ranges, and count of column per df['group']"""
+    groups = df.groupby('group')[column]
+    stats = groups.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'q2', 'q3']
+    iqr = stats['q3'] - stats['q1']
+    stats['upper'] = (stats['q3'] + 1.5 * iqr).clip(upper=groups.max())
+    stats['lower'] = (stats['q1'] - 1.5 * iqr).clip(lower=groups.min())
+    stats['count'] = groups.size()
+    return stats.rename_axis('group').reset_index()
+
+
+def bucketed_boxplot(df):
+    """Box plot of the compound sentiment of the articles of each df['group']"""
+    stats = group_quartiles(df)
+    p = figure(
+        title='Compound sentiment of article titles',
+        x_range=list(stats['group']),
+        y_axis_label='Sentiment Score',
+        min_width=1200,
+        output_backend='webgl',
+    )
+    source = ColumnDataSource(stats)
+    p.add_layout(Whisker(source=source, base='group', upper='upper', lower='lower', line_color='black'))
+    p.vbar(x='group', top='q3', bottom='q2', width=0.7, source=source, fill_color='green', line_color='black')
+    p.vbar(x='group', top='q2', bottom='q1', width=0.7, source=source, fill_color='blue', line_color='black')
+    p.xaxis.major_label_orientation = 'vertical'
+    p.add_tools(HoverTool(tooltips=[('Group', '@group'), ('Articles', '@count'), ('Median', '@q2')]))
+    return p
+
+
 @hud
-def boxplot(df, hud):
+def boxplot(df, hud, max_points=None):
+    """
+    Above max_points articles, a box per df['group'] (see boxplot_groups) instead of
+    a bar per headline, or per max_points sampled headlines if df has no group column
+    """
     boxplot_task = hud.add_task("[grey]Visualizer:Creating Boxplot...", total=1)
+    max_points = large_data_rows if max_points is None else max_points
+    if len(df) > max_points and 'group' in df:
+        p = bucketed_boxplot(df)
+        hud.update(boxplot_task, advance=1)
+        return p
+    df = sample(df, max_points)
     p = figure(
         title='Boxplot for Sentiment Analysis of Article titles',
         x_range=df['headline'].unique(),
@@ -391,3 +558,58 @@ def boxplot(df, hud):
     p.add_tools(HoverTool(tooltips=[('Word', '@word'), ('Count', '@count')]))
     hud.update(boxplot_task, advance=1)
     return p
+
+
+# Plots made by make_plots, the word plots are made from the top words of words_df
+plots = {
+    'word_cloud': word_cloud,
+    'word_count_pie': pie_cart_wordcount,
+    'scatter_sentiment': plot_scatter_sentiment,
+    'scatter': plot_scatter,
+    'sentiment_scatter': plot_sentiment_scatter,
+    'boxplot': boxplot,
+}
+word_plots = {'word_cloud', 'word_count_pie'}
+# Number of articles above which the sentiment plots switch to large data mode
+large_data_rows = 5000
+# Columns of the analyzed DataFrame each of the other plots uses
+plot_columns = {
+    'scatter_sentiment': ['headline_positive', 'headline_negative', 'headline_compound', 'headline_wordcount'],
+    'scatter': ['headline_neutral', 'headline_positive', 'headline_negative', 'headline_compound', 'headline_wordcount'],
+    'sentiment_scatter': ['headline_wordcount', 'headline_compound'],
+    'boxplot': ['headline', 'headline_positive', 'headline_negative', 'headline_neutral', 'headline_compound'],
+}
+
+
+def fingerprint(name, data, mask=None, options=None):
+    """Hash of everything a plot is rendered from"""
+    digest = sha1(name.encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    if isinstance(data, Series):
+        digest.update(hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        digest.update(json.dumps(list(data.columns)).encode())
+        digest.update(hash_pandas_object(data, index=False).to_numpy().tobytes())
+    if isinstance(mask, ndarray):
+        digest.update(mask.tobytes())
+    elif mask is not None:
+        digest.update(str(mask).encode())
+    return digest.hexdigest()
+
+
+def render_plot(name, data, file_path, mask=None, options=None):
+    """Render plot name from data to file_path, in this or a worker process"""
+    if name == 'word_cloud':
+        word_cloud(data, mask=mask).savefig(file_path)
+        plt.close('all')
+    else:
+        save(plots[name](data, **(options or {})), filename=file_path, resources=CDN, title=name)
+    return file_path
+
+
+def pool_context():
+    """
+    Multiprocessing context of the rendering processes: a fork server where available,
+    as forking a process with other threads running can deadlock on their locks
+    """
+    return get_context('forkserver' if 'forkserver' in get_all_start_methods() else 'spawn')